@@ -1,246 +1,622 @@
-import os, json, re, time, webbrowser
-import requests
-from datetime import datetime
+import os, sys, threading, webbrowser
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# 命令行模式（python WFMC.py crawl ...）在导入 PyQt5 / cv2 之前分流，无需图形环境
+if __name__ == "__main__" and sys.argv[1:2] == ["crawl"]:
+    from wfmc_cli import main
+    sys.exit(main())
+
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout,
-    QLineEdit, QScrollArea, QFrame, QGridLayout, QProgressBar, QListWidget, QListWidgetItem, QDialog, QTextEdit,
-    QMessageBox, QFileDialog, QSlider, QComboBox, QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView, QSplashScreen
+    QApplication, QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QLineEdit, QProgressBar,
+    QListView, QDialog, QMessageBox, QTableView, QAbstractItemView, QHeaderView, QSplashScreen,
+    QStyledItemDelegate, QStyle, QMenu
+)
+from PyQt5.QtGui import QPixmap, QImage, QBrush, QPainter, QColor, QFont, QCursor, QLinearGradient, QPen
+from PyQt5.QtCore import (
+    Qt, QTimer, QThread, QObject, QAbstractListModel, QAbstractTableModel, QModelIndex, QRect, QSize, pyqtSignal
 )
-from PyQt5.QtGui import QPixmap, QImage, QBrush, QPalette, QPainter, QColor, QFont, QCursor, QLinearGradient, QPen
-from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 
-import cv2  
+from wfmc_core import (
+    AVATAR_DIR, DEFAULT_AVATAR, CRAWL_CONCURRENCY, CRAWL_RATE_LIMIT,
+    ProgressTracker, format_progress, load_cookie, merge_records, save_cookie
+)
+from wfmc_crawl import UserCrawler, crawl_all_posts
+from wfmc_avatar import get_avatar_cache
+from wfmc_records import RecordList, posts_by_user
+from wfmc_search import NameIndex, SortOrders
+from wfmc_store import STORE_FILE, save_crawl, load_cached, load_snapshot, needs_full_crawl
 
 # =================== 配置 ===================
-BASE_URL = "https://bbs.wtfxxjr.top/api/users?page[number]={}"
-# 添加帖子API基础URL
-POSTS_URL = "https://bbs.wtfxxjr.top/api/discussions?filter[author]={}&page[number]={}"
-# 添加获取所有帖子的URL
-ALL_POSTS_URL = "https://bbs.wtfxxjr.top/api/discussions?page[number]={}"
-AVATAR_DIR = "assets/avatar/"
-COOKIE_FILE = "cookie.json"
-DEFAULT_AVATAR = "https://d.feiliupan.com/t/103549985525600256/user.png"
-
-os.makedirs(AVATAR_DIR, exist_ok=True)
+# 已有本地快照时，“更新数据”只抓取新注册的用户和新增或有新回复的帖子；
+# 老成员的帖子数不在增量范围内，由每隔 FULL_CRAWL_INTERVAL（7 天）的全量爬取更新
+INCREMENTAL_UPDATE = True
+# 线程后端的爬取每完成一页写一次断点，关闭程序或断网后下次更新从已完成的页面继续
+CRAWL_RESUME = True
+# 爬取后端："thread" 使用 QThread 爬虫，"asyncio" 使用 wfmc_async 引擎（需要 aiohttp）
+CRAWL_BACKEND = "thread"
+AVATAR_CONCURRENCY = 8     # 同时下载的头像数
+SEARCH_DEBOUNCE_MS = 150   # 搜索框停止输入多久后才刷新结果
+COOKIE_DEBOUNCE_MS = 800   # Cookie 输入框停止输入多久后才开始更新
+STREAM_FLUSH_MS = 250      # 爬取中逐页到达的数据最多每隔这么久合并进界面一次
+# 用户排序键，入库时已算好（reg_day 为注册日期的天数序号）
+USER_SORT_KEYS = {
+    "reg_time": lambda u: u.reg_day,
+    "posts": lambda u: u.posts,
+}
+# 卡片视图
+CARD_COLUMNS = 4           # 每行卡片数
+CARD_HEIGHT = 320
+CARD_AVATAR_SIZE = 120
+# 头像渲染缓存
+AVATAR_CACHE_BYTES = 32 * 1024 * 1024   # 内存中圆形头像的像素数据上限，超出时淘汰最久未用的
+AVATAR_RENDER_WORKERS = 2  # 后台解码、缩放头像的线程数
+AVATAR_THUMB_CACHE = True  # 把画好的圆形缩略图保存到磁盘，下次启动直接读取
+AVATAR_THUMB_DIR = os.path.join(AVATAR_DIR, "thumbs")
+# 用户名后显示的身份标记
+USER_BADGES = {
+    "iXiangPro": ("[管理员]", QColor("red")),
+    "player_youtiao": ("[版主]", QColor("purple")),
+    "xizhuo61626": ("[版主]", QColor("purple")),
+}
 
 # =================== 工具函数 ===================
-def sanitize_filename(name):
-    return re.sub(r'[^a-zA-Z0-9_\u4e00-\u9fff]', '_', name)
+def async_backend_available():
+    """只有选用 asyncio 后端时才导入 wfmc_async（连带 aiohttp），默认启动不加载"""
+    if CRAWL_BACKEND != "asyncio":
+        return False
+    import wfmc_async
+    return wfmc_async.available()
 
-# 使用线程优化头像下载
-class AvatarDownloadThread(QThread):
-    finished = pyqtSignal(str, str)  # username, path
-    
-    def __init__(self, url, username):
-        super().__init__()
-        self.url = url
-        self.username = username
-    
-    def run(self):
-        if not self.url:
-            self.url = DEFAULT_AVATAR
-        filename = sanitize_filename(self.username) + ".png"
-        local_path = os.path.join(AVATAR_DIR, filename)
-        if os.path.exists(local_path):
-            self.finished.emit(self.username, local_path)
-            return
+def download_avatar(url):
+    """通过头像缓存取得本地路径，失败时返回默认头像地址"""
+    return get_avatar_cache().get(url or DEFAULT_AVATAR) or DEFAULT_AVATAR
+
+# 头像下载流水线：爬虫只产出用户记录，头像由独立的有界线程池并发下载，
+# 相同的头像地址只下载一次，每张头像下载完成后通过信号单独通知界面
+class AvatarPipeline(QObject):
+    avatar_ready = pyqtSignal(int, str)  # user_id, path
+
+    def __init__(self, workers=AVATAR_CONCURRENCY, parent=None):
+        super().__init__(parent)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.waiting = {}  # url -> 等待该头像的 (用户 id, 当前头像路径) 列表
+
+    def submit(self, users):
+        for user in users:
+            url = user.avatar_url or DEFAULT_AVATAR
+            with self.lock:
+                if url in self.waiting:
+                    self.waiting[url].append((user.id, user.avatar))
+                    continue
+                self.waiting[url] = [(user.id, user.avatar)]
+            self.pool.submit(self.download, url)
+
+    def shutdown(self):
+        """退出时丢弃还在排队的下载，不让解释器退出前把整批头像下载完"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def download(self, url):
+        # 缓存出错（数据库被锁、磁盘写满……）时也要移出等待表，否则该地址本次运行都不会再下载
         try:
-            r = requests.get(self.url, timeout=10)
-            if r.status_code == 200:
-                with open(local_path, "wb") as f:
-                    f.write(r.content)
-                self.finished.emit(self.username, local_path)
-                return
-        except:
-            pass
-        self.finished.emit(self.username, DEFAULT_AVATAR)
-
-def download_avatar(url, username):
-    if not url:
-        url = DEFAULT_AVATAR
-    filename = sanitize_filename(username) + ".png"
-    local_path = os.path.join(AVATAR_DIR, filename)
-    if os.path.exists(local_path):
-        return local_path
-    try:
-        r = requests.get(url, timeout=10)
-        if r.status_code == 200:
-            with open(local_path, "wb") as f:
-                f.write(r.content)
-            return local_path
-    except:
-        pass
-    return DEFAULT_AVATAR
-
-# 使用缓存机制优化头像加载
-avatar_cache = {}
-
-def get_avatar_pixmap(avatar_path, size):
-    cache_key = (avatar_path, size)
-    if cache_key in avatar_cache:
-        return avatar_cache[cache_key]
-    
-    pixmap = QPixmap(avatar_path)
-    pixmap = pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-    
+            path = download_avatar(url)
+        finally:
+            with self.lock:
+                waiting = self.waiting.pop(url, [])
+        if path == DEFAULT_AVATAR:
+            return
+        for user_id, current in waiting:
+            if current != path:
+                self.avatar_ready.emit(user_id, path)
+
+# 头像渲染：解码、缩放和圆形遮罩在后台线程里画到 QImage 上（QPixmap 只能在界面线程使用），
+# 画好的缩略图另存到磁盘，界面线程只做 QImage -> QPixmap 转换，结果放进按字节数限额的 LRU 缓存
+def render_avatar_image(avatar_path, size):
+    """返回圆形头像 QImage；文件不存在或无法解码时返回 None。可在任意线程调用"""
+    if not avatar_path or not os.path.isfile(avatar_path):
+        return None
+    # 头像文件按内容哈希命名，缩略图沿用该名字，头像变化时自然换成新的缩略图
+    name = os.path.splitext(os.path.basename(avatar_path))[0]
+    thumb = os.path.join(AVATAR_THUMB_DIR, f"{name}-{size}.png")
+    if os.path.exists(thumb):
+        image = QImage(thumb)
+        if not image.isNull():
+            return image
+
+    image = QImage(avatar_path)
+    if image.isNull():
+        return None
+    image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
     # 创建圆形遮罩
-    rounded_pixmap = QPixmap(pixmap.size())
-    rounded_pixmap.fill(Qt.transparent)
-    painter = QPainter(rounded_pixmap)
+    rounded = QImage(image.size(), QImage.Format_ARGB32_Premultiplied)
+    rounded.fill(Qt.transparent)
+    painter = QPainter(rounded)
     painter.setRenderHint(QPainter.Antialiasing)
-    painter.setBrush(QBrush(pixmap))
+    painter.setBrush(QBrush(image))
     painter.setPen(Qt.NoPen)
-    painter.drawEllipse(0, 0, pixmap.width(), pixmap.height())
+    painter.drawEllipse(0, 0, image.width(), image.height())
     painter.end()
-    
-    avatar_cache[cache_key] = rounded_pixmap
-    return rounded_pixmap
 
-def load_cookie():
-    if os.path.exists(COOKIE_FILE):
-        with open(COOKIE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f).get("cookie", "")
-    return ""
+    if AVATAR_THUMB_CACHE:
+        os.makedirs(AVATAR_THUMB_DIR, exist_ok=True)
+        tmp = f"{thumb}.{threading.get_ident()}.tmp.png"
+        if rounded.save(tmp, "PNG"):
+            os.replace(tmp, thumb)
+    return rounded
+
+class AvatarRenderer(QObject):
+    pixmap_ready = pyqtSignal(str)  # avatar_path，该头像的缓存已就绪，可重绘
+    rendered = pyqtSignal(str, int, QImage)  # 后台线程 -> 界面线程
+
+    def __init__(self, budget=AVATAR_CACHE_BYTES, workers=AVATAR_RENDER_WORKERS, parent=None):
+        super().__init__(parent)
+        self.budget = budget
+        self.cache = OrderedDict()  # (avatar_path, size) -> QPixmap，按最近使用排序
+        self.used = 0  # 缓存中像素数据的字节数
+        self.pending = set()
+        self.placeholders = {}
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.rendered.connect(self.on_rendered)
+
+    def pixmap(self, avatar_path, size):
+        """返回缓存的圆形头像；尚未渲染时安排后台渲染并先返回占位图"""
+        key = (avatar_path, size)
+        pixmap = self.cache.get(key)
+        if pixmap is not None:
+            self.cache.move_to_end(key)
+            return pixmap
+        if key not in self.pending:
+            self.pending.add(key)
+            self.pool.submit(self.render, avatar_path, size)
+        return self.placeholder(size)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def placeholder(self, size):
+        # 头像尚未下载或渲染完成时用浅灰色圆形占位
+        pixmap = self.placeholders.get(size)
+        if pixmap is None:
+            pixmap = QPixmap(size, size)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setBrush(QColor(220, 220, 220))
+            painter.setPen(Qt.NoPen)
+            painter.drawEllipse(0, 0, size, size)
+            painter.end()
+            self.placeholders[size] = pixmap
+        return pixmap
+
+    def render(self, avatar_path, size):
+        try:
+            image = render_avatar_image(avatar_path, size)
+        except Exception:
+            image = None
+        self.rendered.emit(avatar_path, size, image if image is not None else QImage())
+
+    def on_rendered(self, avatar_path, size, image):
+        key = (avatar_path, size)
+        self.pending.discard(key)
+        if image.isNull():
+            # 无法解码（如默认头像还是网址）时缓存占位图，避免反复提交
+            self.insert(key, self.placeholder(size))
+            return
+        self.insert(key, QPixmap.fromImage(image))
+        self.pixmap_ready.emit(avatar_path)
+
+    def insert(self, key, pixmap):
+        old = self.cache.pop(key, None)
+        if old is not None:
+            self.used -= self.cost(old)
+        self.cache[key] = pixmap
+        self.used += self.cost(pixmap)
+        while self.used > self.budget and len(self.cache) > 1:
+            _, evicted = self.cache.popitem(last=False)
+            self.used -= self.cost(evicted)
+
+    @staticmethod
+    def cost(pixmap):
+        return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+# =================== 卡片视图 ===================
+# 卡片视图的数据模型，只保存当前筛选排序后的用户，由视图按需绘制可见的卡片
+class UserListModel(QAbstractListModel):
+    UserRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.users = []
+        self.rows = {}  # user id -> 行号
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.users)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        user = self.users[index.row()]
+        if role == self.UserRole:
+            return user
+        if role == Qt.DisplayRole:
+            return user.name
+        return None
+
+    def set_users(self, users):
+        self.beginResetModel()
+        self.users = users
+        self.rows = {u.id: row for row, u in enumerate(users)}
+        self.endResetModel()
+
+    def row_of(self, user_id):
+        return self.rows.get(user_id)
+
+    def user_changed(self, user_id):
+        """某个用户的数据（如头像）更新后只重绘这一张卡片"""
+        row = self.rows.get(user_id)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
 
-def save_cookie(cookie):
-    with open(COOKIE_FILE, "w", encoding="utf-8") as f:
-        json.dump({"cookie": cookie}, f, ensure_ascii=False, indent=4)
+# 用画笔直接绘制卡片，替代每个用户一个 QFrame + 四个 QLabel
+class UserCardDelegate(QStyledItemDelegate):
+    def __init__(self, renderer, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+
+    def sizeHint(self, option, index):
+        return self.parent().gridSize()
+
+    def paint(self, painter, option, index):
+        user = index.data(UserListModel.UserRole)
+        rect = option.rect.adjusted(10, 10, -10, -10)
+        selected = bool(option.state & QStyle.State_Selected)
+        hover = bool(option.state & QStyle.State_MouseOver)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.TextAntialiasing)
+
+        # 半透明渐变背景，选中时换成蓝色系并加粗边框
+        gradient = QLinearGradient(rect.topLeft(), rect.bottomRight())
+        if selected:
+            alpha = 255 if hover else 230
+            gradient.setColorAt(0, QColor(227, 242, 253, alpha))
+            gradient.setColorAt(1, QColor(187, 222, 251, alpha))
+            painter.setPen(QPen(QColor(100, 149, 237, 204), 2))
+        else:
+            alpha = 242 if hover else 217
+            gradient.setColorAt(0, QColor(255, 255, 255, alpha))
+            gradient.setColorAt(1, QColor(240, 248, 255, alpha))
+            painter.setPen(QPen(QColor(255, 255, 255, 128), 1))
+        painter.setBrush(QBrush(gradient))
+        painter.drawRoundedRect(rect, 15, 15)
+
+        # 头像
+        top = rect.top() + 20
+        pixmap = self.renderer.pixmap(user.avatar, CARD_AVATAR_SIZE)
+        painter.drawPixmap(rect.center().x() - pixmap.width() // 2, top, pixmap)
+        top += CARD_AVATAR_SIZE + 15
+
+        # 用户名与身份标记
+        name_font = QFont("Microsoft YaHei")
+        name_font.setPixelSize(24)
+        name_font.setBold(True)
+        painter.setFont(name_font)
+        painter.setPen(QColor("#333"))
+        badge = USER_BADGES.get(user.name)
+        if badge:
+            badge_font = QFont(name_font)
+            badge_font.setPixelSize(20)
+            name_width = painter.fontMetrics().horizontalAdvance(user.name + " ")
+            painter.setFont(badge_font)
+            badge_width = painter.fontMetrics().horizontalAdvance(badge[0])
+            left = rect.center().x() - (name_width + badge_width) // 2
+            painter.setFont(name_font)
+            painter.drawText(QRect(left, top, name_width, 36), Qt.AlignLeft | Qt.AlignVCenter, user.name)
+            painter.setFont(badge_font)
+            painter.setPen(badge[1])
+            painter.drawText(QRect(left + name_width, top, badge_width + 10, 36), Qt.AlignLeft | Qt.AlignVCenter, badge[0])
+        else:
+            painter.drawText(QRect(rect.left(), top, rect.width(), 36), Qt.AlignCenter, user.name)
+        top += 36 + 15
+
+        # 注册时间与发帖数
+        info_font = QFont("Microsoft YaHei")
+        info_font.setPixelSize(18)
+        painter.setFont(info_font)
+        painter.setPen(QColor("#333"))
+        painter.drawText(QRect(rect.left(), top, rect.width(), 26), Qt.AlignCenter, f"注册：{user.reg_time}")
+        top += 26 + 15
+        painter.drawText(QRect(rect.left(), top, rect.width(), 26), Qt.AlignCenter, f"发帖数：{user.posts}")
+        painter.restore()
+
+# 图标模式的列表视图，宽度变化时保持每行 CARD_COLUMNS 张卡片
+class CardListView(QListView):
+    def __init__(self, renderer, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(200)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setMouseTracking(True)
+        self.viewport().setCursor(QCursor(Qt.PointingHandCursor))
+        self.setGridSize(QSize(400, CARD_HEIGHT))
+        self.setItemDelegate(UserCardDelegate(renderer, self))
+        # 头像在后台渲染好后重绘可见区域
+        renderer.pixmap_ready.connect(lambda avatar_path: self.viewport().update())
+
+    def resizeEvent(self, event):
+        width = max(1, self.viewport().width() // CARD_COLUMNS)
+        if width != self.gridSize().width():
+            self.setGridSize(QSize(width, CARD_HEIGHT))
+        super().resizeEvent(event)
+
+# =================== 表格视图 ===================
+# 只读表格模型：记录保存在列表里，排序和筛选只调整可见行到记录的映射，不创建任何单元格对象
+class RecordTableModel(QAbstractTableModel):
+    RecordRole = Qt.UserRole + 1
+    COLUMNS = ()  # (表头, 字段, 排序键)
+    FILTER_FIELD = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.records = []
+        self.order = []  # 可见行 -> records 下标
+        self.filter_text = ""
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.records[self.order[index.row()]]
+        if role == Qt.DisplayRole:
+            return str(getattr(record, self.COLUMNS[index.column()][1]))
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignCenter)
+        if role == self.RecordRole:
+            return record
+        return None
+
+    def set_records(self, records):
+        """替换数据；records 的顺序就是未按表头排序时的显示顺序"""
+        self.beginResetModel()
+        self.records = records
+        self.order = self.compute_order()
+        self.endResetModel()
+
+    def set_filter_text(self, text):
+        self.beginResetModel()
+        self.filter_text = text.lower()
+        self.order = self.compute_order()
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """表头点击排序；column 为 -1 时恢复 records 原有顺序"""
+        self.layoutAboutToBeChanged.emit()
+        old = self.persistentIndexList()
+        # 排序只改变行的先后，持久索引（选中行、当前行）按记录跟到新位置
+        records_of = [self.order[index.row()] for index in old]
+        self.sort_column = column
+        self.sort_order = order
+        self.order = self.compute_order()
+        row_of = {record: row for row, record in enumerate(self.order)}
+        self.changePersistentIndexList(old, [
+            self.index(row_of[record], index.column()) for record, index in zip(records_of, old)
+        ])
+        self.layoutChanged.emit()
+
+    def compute_order(self):
+        records = self.records
+        if self.filter_text and self.FILTER_FIELD:
+            kw = self.filter_text
+            rows = [i for i, r in enumerate(records) if kw in getattr(r, self.FILTER_FIELD).lower()]
+        else:
+            rows = list(range(len(records)))
+        if 0 <= self.sort_column < len(self.COLUMNS):
+            key = self.COLUMNS[self.sort_column][2]
+            rows.sort(key=lambda i: key(records[i]), reverse=self.sort_order == Qt.DescendingOrder)
+        return rows
+
+class UserTableModel(RecordTableModel):
+    COLUMNS = (
+        ("ID", "id", lambda u: u.id),
+        ("用户名", "name", lambda u: u.name.lower()),
+        ("注册时间", "reg_time", lambda u: u.reg_day),
+        ("发帖数", "posts", lambda u: u.posts),
+    )
+    FILTER_FIELD = "name"
+
+class PostTableModel(RecordTableModel):
+    COLUMNS = (
+        ("ID", "id", lambda p: p.id),
+        ("标题", "title", lambda p: p.title.lower()),
+        ("发布时间", "created_at", lambda p: p.created_day),
+        ("评论数", "comment_count", lambda p: p.comment_count),
+    )
+    FILTER_FIELD = "title"
+
+def make_table_view(model):
+    view = QTableView()
+    view.setModel(model)
+    view.setEditTriggers(QAbstractItemView.NoEditTriggers)  # 设置为只读
+    view.setSelectionBehavior(QAbstractItemView.SelectRows)  # 设置整行选择
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 自动调整列宽
+    view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+    view.setSortingEnabled(True)  # 点击表头排序，由模型自己完成
+    view.verticalHeader().setDefaultSectionSize(44)
+    return view
+
+# =================== 爬取任务 ===================
+# 可协作取消的爬取线程：cancel() 只设置标记，爬虫在每次请求前检查，
+# 被取消的线程不写入本地存储、不发出 finished
+class CancellableThread(QThread):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+# 爬取任务管理：每类任务同时只保留一个，新任务立即取代旧任务（旧任务协作式取消，不等待它结束），
+# 参数相同的重复请求直接合并到正在运行的任务上
+class JobManager(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = {}  # kind -> (key, thread)
+        self.retired = set()  # 已取消但尚未退出的线程，保持引用以免运行中被回收
+
+    def submit(self, kind, key, factory):
+        """启动一个任务并返回新线程；同类且 key 相同的任务仍在运行时返回 None"""
+        self.retired = {t for t in self.retired if t.isRunning()}
+        current = self.jobs.get(kind)
+        if current and current[0] == key and current[1].isRunning() and not current[1].is_cancelled():
+            return None
+        self.cancel(kind)
+        thread = factory()
+        self.jobs[kind] = (key, thread)
+        thread.start()
+        return thread
+
+    def cancel(self, kind):
+        """取消某类任务，立即返回；返回是否确有任务在运行"""
+        current = self.jobs.pop(kind, None)
+        if not current or not current[1].isRunning():
+            return False
+        current[1].cancel()
+        self.retired.add(current[1])
+        return True
+
+    def current(self, kind):
+        job = self.jobs.get(kind)
+        return job[1] if job else None
+
+    def is_current(self, kind, thread):
+        return thread is not None and self.current(kind) is thread
+
+    def shutdown(self):
+        """退出程序时取消全部任务并等待线程结束
+
+        取消在等待限流、重试和线程池退出时都会生效，线程最多还要跑完手上那一个请求；
+        不能提前放弃：QThread 对象在线程仍运行时被销毁会让 Qt 直接中止进程
+        """
+        for kind in list(self.jobs):
+            self.cancel(kind)
+        for thread in self.retired:
+            thread.wait()
 
 # 添加用户数据爬取线程
-class UserCrawlThread(QThread):
-    progress = pyqtSignal(int, int)  # current, total
-    finished = pyqtSignal(list)  # users list
+class UserCrawlThread(CancellableThread):
+    progress = pyqtSignal(dict)  # ProgressTracker 的进度快照，已节流
+    batch = pyqtSignal(list)  # 每抓完一页发出这一页的用户
+    finished = pyqtSignal(list, bool)  # users list, 是否完整（有页面失败时为 False）
     
-    def __init__(self, cookie):
+    def __init__(self, cookie, concurrency=CRAWL_CONCURRENCY, rate_limit=CRAWL_RATE_LIMIT, incremental=False):
         super().__init__()
         self.cookie = cookie
-    
+        self.crawler = UserCrawler(cookie, concurrency, rate_limit, on_batch=self.batch.emit,
+                                   progress=self.progress.emit, should_stop=self.is_cancelled,
+                                   checkpoint_path=STORE_FILE if CRAWL_RESUME else None)
+        # 增量模式下以本地存储中的快照为基准
+        self.incremental = incremental
+
     def run(self):
-        headers = {"User-Agent": "CensusApp"}
-        if self.cookie:
-            headers["Cookie"] = self.cookie
-
-        users = []
-        page = 1
-        total = 0
-        # 先获取总页数
-        url = BASE_URL.format(1)
-        resp = requests.get(url, headers=headers)
-        if resp.status_code == 200:
-            meta = resp.json().get("meta", {})
-            total = meta.get("total", 0)
-        while True:
-            url = BASE_URL.format(page)
-            resp = requests.get(url, headers=headers)
-            if resp.status_code != 200:
-                break
-            data = resp.json().get("data", [])
-            if not data:
-                break
-            for u in data:
-                user_id = u["id"]
-                if user_id == "4":
-                    continue
-                attr = u["attributes"]
-                users.append({
-                    "id": user_id,
-                    "name": attr["username"],
-                    "avatar": download_avatar(attr.get("avatarUrl"), attr["username"]),
-                    "reg_time": attr["joinTime"][:10],
-                    "posts": attr.get("discussionCount", 0) + attr.get("commentCount", 0)
-                })
-                self.progress.emit(len(users), total)
-            page += 1
-            time.sleep(0.3)
-        self.finished.emit(users)
-
-# 添加爬取用户帖子的函数
-def crawl_user_posts(cookie, user_id, username, progress_callback=None):
-    headers = {"User-Agent": "CensusApp"}
-    if cookie:
-        headers["Cookie"] = cookie
-
-    posts = []
-    page = 1
-    total = 0
-    # 先获取总页数
-    url = POSTS_URL.format(user_id, 1)
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code == 200:
-            meta = resp.json().get("meta", {})
-            total = meta.get("total", 0)
-    except:
-        pass
-
-    while True:
-        url = POSTS_URL.format(user_id, page)
-        try:
-            resp = requests.get(url, headers=headers, timeout=10)
-            if resp.status_code != 200:
-                break
-            data = resp.json().get("data", [])
-            if not data:
-                break
-            for p in data:
-                attr = p["attributes"]
-                posts.append({
-                    "id": p["id"],
-                    "title": attr.get("title", "无标题"),
-                    "created_at": attr["createdAt"][:10] if attr.get("createdAt") else "未知",
-                    "comment_count": attr.get("commentCount", 0)
-                })
-                if progress_callback:
-                    progress_callback(len(posts), total, f"正在爬取 {username} 的帖子...")
-            page += 1
-            time.sleep(0.3)
-        except:
-            break
-    return posts
-
-# 添加爬取所有帖子的函数
-def crawl_all_posts(cookie, progress_callback=None):
-    headers = {"User-Agent": "CensusApp"}
-    if cookie:
-        headers["Cookie"] = cookie
-
-    posts = []
-    page = 1
-    total = 0
-    # 先获取总页数
-    url = ALL_POSTS_URL.format(1)
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code == 200:
-            meta = resp.json().get("meta", {})
-            total = meta.get("total", 0)
-    except:
-        pass
-
-    while True:
-        url = ALL_POSTS_URL.format(page)
+        if self.incremental:
+            users, complete = self.crawler.crawl_incremental(load_snapshot("users"))
+        else:
+            users, complete = self.crawler.crawl()
+        if self.is_cancelled():
+            return
+        save_crawl(users=users, full=not self.incremental, complete=complete)
+        self.finished.emit(users, complete)
+
+# asyncio 引擎的桥接线程：一个线程跑完整个事件循环，结果通过信号交回界面
+class AsyncCrawlThread(CancellableThread):
+    progress = pyqtSignal(dict)  # 用户爬取的进度快照
+    batch = pyqtSignal(list)  # 每页用户
+    posts_batch = pyqtSignal(list)  # 每页帖子
+    finished = pyqtSignal(list, bool)  # users list, 是否完整
+    posts_finished = pyqtSignal(list, bool)  # all posts list, 是否完整
+
+    def __init__(self, cookie, with_posts=True):
+        super().__init__()
+        self.cookie = cookie
+        self.with_posts = with_posts
+        self.tracker = ProgressTracker(self.progress.emit)
+
+    def on_progress(self, kind, current, total):
+        if kind == "users":
+            self.tracker.set_done(current, total)
+
+    def on_batch(self, kind, records):
+        (self.batch if kind == "users" else self.posts_batch).emit(records)
+
+    def run(self):
+        import wfmc_async
         try:
-            resp = requests.get(url, headers=headers, timeout=10)
-            if resp.status_code != 200:
-                break
-            data = resp.json().get("data", [])
-            if not data:
-                break
-            for p in data:
-                attr = p["attributes"]
-                posts.append({
-                    "id": p["id"],
-                    "title": attr.get("title", "无标题"),
-                    "created_at": attr["createdAt"][:10] if attr.get("createdAt") else "未知",
-                    "comment_count": attr.get("commentCount", 0)
-                })
-                if progress_callback:
-                    progress_callback(len(posts), total, "正在爬取所有帖子...")
-            page += 1
-            time.sleep(0.3)
-        except:
-            break
-    return posts
+            # 头像交给界面的 AvatarPipeline 下载
+            users, posts, failed = wfmc_async.run_census(
+                self.cookie, self.on_progress, self.with_posts, with_avatars=False, on_batch=self.on_batch,
+                should_stop=self.is_cancelled)
+        except Exception:
+            users, posts, failed = [], [], {"users", "posts"}
+        self.tracker.report(force=True)
+        if self.is_cancelled():
+            return
+        users_complete, posts_complete = "users" not in failed, "posts" not in failed
+        save_crawl(users=users, complete=users_complete)
+        self.finished.emit(users, users_complete)
+        if self.with_posts:
+            save_crawl(posts=posts, complete=posts_complete)
+            self.posts_finished.emit(posts, posts_complete)
+
+# 后台爬取所有帖子的线程，可随时取消
+class AllPostsCrawlThread(CancellableThread):
+    progress = pyqtSignal(dict)  # 进度快照，已节流
+    batch = pyqtSignal(list)  # 每抓完一页发出这一页的帖子
+    finished = pyqtSignal(list, bool)  # all posts list, 是否完整
+
+    def __init__(self, cookie, parent=None, incremental=False):
+        super().__init__(parent)
+        self.cookie = cookie
+        self.incremental = incremental
+
+    def run(self):
+        known = load_snapshot("discussions") if self.incremental else None
+        posts, complete = crawl_all_posts(
+            self.cookie,
+            known=known,
+            progress=self.progress.emit,
+            should_stop=self.is_cancelled,
+            on_batch=self.batch.emit,
+            checkpoint_path=STORE_FILE if CRAWL_RESUME else None
+        )
+        if self.is_cancelled():
+            return
+        save_crawl(posts=posts, full=not self.incremental, complete=complete)
+        self.finished.emit(posts, complete)
 
 # =================== 界面类 ===================
 
@@ -257,12 +633,30 @@ class CensusApp(QWidget):
         self.selected_id = None
         # 添加视图模式属性
         self.view_mode = "card"  # "card" 或 "table"
-        # 添加帖子数据存储
+        # 用户 id -> 该用户帖子在 all_posts 中的行号
         self.user_posts = {}
         # 添加所有帖子数据存储
-        self.all_posts = []
-        # 添加爬取线程
-        self.crawl_thread = None
+        self.all_posts = RecordList()
+        # 爬取任务："users" 为用户（asyncio 后端同时抓帖子），"posts" 为后台帖子爬取
+        self.jobs = JobManager(self)
+        # 头像下载流水线，卡片在头像到达时原地更新
+        self.name_index = NameIndex([])
+        self.sort_orders = SortOrders([], USER_SORT_KEYS)
+        self.avatar_pipeline = AvatarPipeline(parent=self)
+        self.avatar_renderer = AvatarRenderer(parent=self)
+        self.avatar_pipeline.avatar_ready.connect(self.on_avatar_ready)
+        # 爬取中逐页到达的数据先放进缓冲区，由定时器合并后一次刷新界面
+        self.pending_users = []
+        self.pending_posts = []
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setSingleShot(True)
+        self.stream_timer.setInterval(STREAM_FLUSH_MS)
+        self.stream_timer.timeout.connect(self.flush_stream)
+        # 从本地存储读取上次爬取的数据
+        users, posts = load_cached()
+        self.set_users(users)
+        self.all_posts = RecordList(posts)
+        self.associate_posts_with_users(self.all_posts)
 
         # 设置主窗口半透明背景
         self.setStyleSheet("""
@@ -273,8 +667,7 @@ class CensusApp(QWidget):
             }
         """)
 
-        # 延迟初始化UI，先显示启动画面
-        QTimer.singleShot(1500, self.init_ui)  # 1.5秒后初始化主界面
+        self.init_ui()
 
     def init_ui(self):
         # 顶部布局
@@ -288,7 +681,12 @@ class CensusApp(QWidget):
         update_btn.clicked.connect(self.update_data)
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("搜索用户名...")
-        self.search_input.textChanged.connect(self.render_users)
+        # 输入防抖：停止输入 SEARCH_DEBOUNCE_MS 毫秒后再刷新
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.render_users)
+        self.search_input.textChanged.connect(self.search_timer.start)
         
         # 添加查看所有帖子按钮
         self.view_all_posts_btn = QPushButton("查看所有帖子")
@@ -366,14 +764,16 @@ class CensusApp(QWidget):
         top_layout.addWidget(self.sort_post_btn, 1)
         top_layout.addWidget(self.view_toggle_btn, 1)  # 添加视图切换按钮到布局
 
-        # 滚动区域
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        # 隐藏垂直滚动条
-        self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.scroll_area.setStyleSheet("""
-            QScrollArea {
+        # 卡片视图（只绘制可见的卡片）
+        self.card_model = UserListModel(self)
+        self.card_view = CardListView(self.avatar_renderer)
+        self.card_view.setModel(self.card_model)
+        self.card_view.clicked.connect(self.on_card_clicked)
+        # 右键用户：查看该用户的帖子或打开主页
+        self.card_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.card_view.customContextMenuRequested.connect(lambda pos: self.show_user_menu(self.card_view, pos))
+        self.card_view.setStyleSheet("""
+            QListView {
                 border: none;
                 background: transparent;
             }
@@ -391,29 +791,22 @@ class CensusApp(QWidget):
                 background: rgba(70, 130, 180, 0.8);
             }
         """)
-        self.user_grid = QGridLayout()
-        self.user_grid.setSpacing(20)
-        container_widget = QWidget()
-        container_widget.setLayout(self.user_grid)
-        self.scroll_area.setWidget(container_widget)
 
         # 添加表格视图
-        self.table_widget = QTableWidget()
-        self.table_widget.setColumnCount(5)
-        self.table_widget.setHorizontalHeaderLabels(["ID", "用户名", "注册时间", "发帖数", "操作"])
-        self.table_widget.setEditTriggers(QAbstractItemView.NoEditTriggers)  # 设置为只读
-        self.table_widget.setSelectionBehavior(QAbstractItemView.SelectRows)  # 设置整行选择
-        self.table_widget.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 自动调整列宽
-        self.table_widget.hide()  # 默认隐藏表格视图
-        self.table_widget.setStyleSheet("""
-            QTableWidget {
+        self.table_model = UserTableModel(self)
+        self.table_view = make_table_view(self.table_model)
+        self.table_view.hide()  # 默认隐藏表格视图
+        self.table_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.table_view.customContextMenuRequested.connect(lambda pos: self.show_user_menu(self.table_view, pos))
+        self.table_view.setStyleSheet("""
+            QTableView {
                 background: rgba(255, 255, 255, 0.8);
                 border-radius: 15px;
                 font-size: 16px;
                 padding: 10px;
                 gridline-color: rgba(200, 200, 200, 0.5);
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 10px;
                 border-bottom: 1px solid rgba(200, 200, 200, 0.3);
             }
@@ -426,7 +819,7 @@ class CensusApp(QWidget):
                 border: none;
                 border-radius: 0px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: rgba(100, 149, 237, 0.3);
             }
         """)
@@ -472,8 +865,8 @@ class CensusApp(QWidget):
         main_layout.addWidget(self.count_label)
         main_layout.addWidget(self.progress_bar)  # 用进度条替换原来的标签
         main_layout.addLayout(top_layout)
-        main_layout.addWidget(self.scroll_area)
-        main_layout.addWidget(self.table_widget)  # 添加表格到主布局
+        main_layout.addWidget(self.card_view)
+        main_layout.addWidget(self.table_view)  # 添加表格到主布局
         self.setLayout(main_layout)
 
         self.progress_bar.mouseDoubleClickEvent = self.show_cmd_dialog
@@ -528,20 +921,37 @@ class CensusApp(QWidget):
             }
         """)
         self.all_posts_progress_bar.hide()
-        main_layout.addWidget(self.all_posts_progress_bar)
+        self.cancel_all_posts_btn = QPushButton("取消")
+        self.cancel_all_posts_btn.setStyleSheet(glass_css)
+        self.cancel_all_posts_btn.clicked.connect(self.cancel_all_posts_crawl)
+        self.cancel_all_posts_btn.hide()
+        all_posts_layout = QHBoxLayout()
+        all_posts_layout.addWidget(self.all_posts_progress_bar, 1)
+        all_posts_layout.addWidget(self.cancel_all_posts_btn)
+        main_layout.addLayout(all_posts_layout)
 
         # 检测cookie栏行为，如果有cookie信息就尝试更新
-        self.cookie_input.textChanged.connect(self.check_cookie_and_update)
+        # 输入防抖：停止输入 COOKIE_DEBOUNCE_MS 毫秒后才更新，避免每个按键都触发一次爬取
+        self.cookie_timer = QTimer(self)
+        self.cookie_timer.setSingleShot(True)
+        self.cookie_timer.setInterval(COOKIE_DEBOUNCE_MS)
+        self.cookie_timer.timeout.connect(self.check_cookie_and_update)
+        self.cookie_input.textChanged.connect(self.cookie_timer.start)
 
-        # 如果启动时有cookie，自动更新
+        # 先显示本地缓存的数据，再进行网络爬取
+        if self.users:
+            self.render_users()
+
+        # 如果启动时有cookie，等窗口显示出缓存数据后再开始更新
         if self.cookie:
-            self.update_data()
+            QTimer.singleShot(0, self.update_data)
 
     def toggle_reg_sort(self):
         self.sort_key = "reg_time"
         self.sort_asc = not self.sort_asc
         self.sort_reg_btn.setText(f"注册时间 {'↓' if self.sort_asc else '↑'}")
         self.sort_post_btn.setText("发帖数 ↓")
+        self.reset_table_sort()
         self.render_users()
 
     def toggle_post_sort(self):
@@ -549,6 +959,7 @@ class CensusApp(QWidget):
         self.sort_asc = not self.sort_asc
         self.sort_post_btn.setText(f"发帖数 {'↓' if self.sort_asc else '↑'}")
         self.sort_reg_btn.setText("注册时间 ↓")
+        self.reset_table_sort()
         self.render_users()
 
     def toggle_view_mode(self):
@@ -556,57 +967,35 @@ class CensusApp(QWidget):
         if self.view_mode == "card":
             self.view_mode = "table"
             self.view_toggle_btn.setText("切换到卡片视图")
-            self.scroll_area.hide()
-            self.table_widget.show()
+            self.card_view.hide()
+            self.table_view.show()
             self.populate_table()
         else:
             self.view_mode = "card"
             self.view_toggle_btn.setText("切换到表格视图")
-            self.table_widget.hide()
-            self.scroll_area.show()
+            self.table_view.hide()
+            self.card_view.show()
             self.render_users()
 
+    def visible_users(self):
+        """按搜索框筛选并按当前排序方式排序后的用户"""
+        matches = self.name_index.search(self.search_input.text())
+        # 排好序的行号按 (排序键, 方向) 缓存，只在数据变化时重建
+        order = self.sort_orders.rows(self.sort_key, self.sort_asc)
+        if matches is None:
+            return [self.users[row] for row in order]
+        return [self.users[row] for row in order if row in matches]
+
+    def reset_table_sort(self):
+        """使用顶部排序按钮时清除表头排序，表格按按钮指定的顺序显示"""
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+
     def populate_table(self):
         """填充表格数据"""
-        # 清空现有数据
-        self.table_widget.setRowCount(0)
-        
-        # 筛选+排序
-        kw = self.search_input.text().lower()
-        users = [u for u in self.users if kw in u["name"].lower()]
-        if self.sort_key == "reg_time":
-            users.sort(key=lambda x: datetime.strptime(x["reg_time"], "%Y-%m-%d"), reverse=not self.sort_asc)
-        else:
-            users.sort(key=lambda x: x["posts"], reverse=not self.sort_asc)
-        
-        # 设置行数 (修改：从5列改为4列，移除操作列)
-        self.table_widget.setColumnCount(4)
-        self.table_widget.setHorizontalHeaderLabels(["ID", "用户名", "注册时间", "发帖数"])
-        self.table_widget.setRowCount(len(users))
-        
-        # 填充数据
-        for row, user in enumerate(users):
-            # ID列
-            id_item = QTableWidgetItem(user["id"])
-            id_item.setTextAlignment(Qt.AlignCenter)
-            self.table_widget.setItem(row, 0, id_item)
-            
-            # 用户名列
-            name_item = QTableWidgetItem(user["name"])
-            name_item.setTextAlignment(Qt.AlignCenter)
-            self.table_widget.setItem(row, 1, name_item)
-            
-            # 注册时间列
-            reg_item = QTableWidgetItem(user["reg_time"])
-            reg_item.setTextAlignment(Qt.AlignCenter)
-            self.table_widget.setItem(row, 2, reg_item)
-            
-            # 发帖数列
-            posts_item = QTableWidgetItem(str(user["posts"]))
-            posts_item.setTextAlignment(Qt.AlignCenter)
-            self.table_widget.setItem(row, 3, posts_item)
-            
-        
+        users = self.visible_users()
+
+        # 只替换模型数据，表头排序（如有）由模型保持
+        self.table_model.set_records(users)
         self.count_label.setText(f"总人数：{len(users)}")
 
     def open_user_page(self, user_id):
@@ -616,132 +1005,46 @@ class CensusApp(QWidget):
     def render_users(self):
         # 根据当前视图模式决定如何渲染
         if self.view_mode == "card":
-            # 清空原有元素
-            for i in reversed(range(self.user_grid.count())):
-                item = self.user_grid.itemAt(i)
-                if item.widget():
-                    item.widget().deleteLater()
-
-            # 筛选+排序
-            kw = self.search_input.text().lower()
-            users = [u for u in self.users if kw in u["name"].lower()]
-            if self.sort_key == "reg_time":
-                users.sort(key=lambda x: datetime.strptime(x["reg_time"], "%Y-%m-%d"), reverse=not self.sort_asc)
-            else:
-                users.sort(key=lambda x: x["posts"], reverse=not self.sort_asc)
-
-            # 渲染成网格
-            row, col = 0, 0
-            for u in users:
-                card = self.build_card(u)
-                self.user_grid.addWidget(card, row, col)
-                col += 1
-                if col >= 4:  # 每行 4 个
-                    col = 0
-                    row += 1
+            users = self.visible_users()
+
+            # 只替换模型数据，卡片由视图按需绘制
+            self.card_model.set_users(users)
+            row = self.card_model.row_of(self.selected_id)
+            if row is not None:
+                self.card_view.setCurrentIndex(self.card_model.index(row))
 
             self.count_label.setText(f"总人数：{len(users)}")
         else:
             # 表格模式下更新表格
             self.populate_table()
 
-    def build_card(self, user):
-        frame = QFrame()
-        frame.setFrameShape(QFrame.Box)
-        # 设置半透明卡片样式，减小内边距但加大字体
-        frame.setStyleSheet(f"""
-            QFrame {{
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1, 
-                    stop: 0 rgba(255, 255, 255, 0.85), stop: 1 rgba(240, 248, 255, 0.85));
-                border-radius: 15px;
-                padding: 20px;
-                backdrop-filter: blur(10px);
-                border: 1px solid rgba(255, 255, 255, 0.5);
-                box-shadow: 3px 3px 10px rgba(0, 0, 0, 0.1);
-            }}
-            QFrame:hover {{
-                background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1, 
-                    stop: 0 rgba(255, 255, 255, 0.95), stop: 1 rgba(240, 248, 255, 0.95));
-                box-shadow: 5px 5px 15px rgba(0, 0, 0, 0.15);
-            }}
-        """)
-        # 添加选中状态标记
-        frame._is_selected = False
-        layout = QVBoxLayout()
-        layout.setSpacing(15)
+    def on_card_clicked(self, index):
+        """第一次点击选中卡片，再次点击已选中的卡片打开用户主页"""
+        user = index.data(UserListModel.UserRole)
+        if self.selected_id == user.id:
+            self.open_user_page(user.id)
+            self.selected_id = None
+            self.card_view.clearSelection()
+        else:
+            self.selected_id = user.id
 
-        # 头像（改为圆形并减小尺寸）
-        size = 120  # 减小头像尺寸
-        rounded_pixmap = get_avatar_pixmap(user["avatar"], size)
-        
-        avatar_label = QLabel()
-        avatar_label.setPixmap(rounded_pixmap)
-        avatar_label.setAlignment(Qt.AlignCenter)
-
-        # 信息标签，进一步加大字体
-        name_text = f"<b><span style='font-size: 24px;'>{user['name']}</span></b>"  # 加大字体
-        if user['name'] == 'iXiangPro':
-            name_text = f"<b><span style='font-size: 24px; color: black; text-shadow: -1px -1px 0 red, 1px -1px 0 red, -1px 1px 0 red, 1px 1px 0 red;'>{user['name']}</span> <span style='font-size: 20px; color: red;'>[管理员]</span></b>"
-        elif user['name'] in ['player_youtiao', 'xizhuo61626']:
-            name_text = f"<b><span style='font-size: 24px;'>{user['name']}</span> <span style='font-size: 20px; color: purple;'>[版主]</span></b>"
-        
-        name_label = QLabel(name_text)
-        name_label.setAlignment(Qt.AlignCenter)
-        reg_label = QLabel(f"<span style='font-size: 18px;'>注册：{user['reg_time']}</span>")  # 加大字体
-        reg_label.setAlignment(Qt.AlignCenter)
-        post_label = QLabel(f"<span style='font-size: 18px;'>发帖数：{user['posts']}</span>")  # 加大字体
-        post_label.setAlignment(Qt.AlignCenter)
-
-        def card_click(event):
-            if event.button() == Qt.LeftButton:
-                if self.selected_id == user["id"]:
-                    webbrowser.open(f"https://bbs.wtfxxjr.top/u/{user['id']}")
-                    self.selected_id = None
-                    frame._is_selected = False
-                    frame.setStyleSheet(f"""
-                        QFrame {{
-                            background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1, 
-                                stop: 0 rgba(255, 255, 255, 0.85), stop: 1 rgba(240, 248, 255, 0.85));
-                            border-radius: 15px;
-                            padding: 20px;
-                            backdrop-filter: blur(10px);
-                            border: 1px solid rgba(255, 255, 255, 0.5);
-                            box-shadow: 3px 3px 10px rgba(0, 0, 0, 0.1);
-                        }}
-                        QFrame:hover {{
-                            background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1, 
-                                stop: 0 rgba(255, 255, 255, 0.95), stop: 1 rgba(240, 248, 255, 0.95));
-                            box-shadow: 5px 5px 15px rgba(0, 0, 0, 0.15);
-                        }}
-                    """)
-                else:
-                    self.selected_id = user["id"]
-                    frame._is_selected = True
-                    frame.setStyleSheet(f"""
-                        QFrame {{
-                            background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1, 
-                                stop: 0 rgba(227, 242, 253, 0.9), stop: 1 rgba(187, 222, 251, 0.9));
-                            border-radius: 15px;
-                            padding: 20px;
-                            backdrop-filter: blur(10px);
-                            border: 2px solid rgba(100, 149, 237, 0.8);
-                            box-shadow: 3px 3px 10px rgba(0, 0, 0, 0.15);
-                        }}
-                        QFrame:hover {{
-                            background: qlineargradient(x1: 0, y1: 0, x2: 1, y2: 1, 
-                                stop: 0 rgba(227, 242, 253, 1), stop: 1 rgba(187, 222, 251, 1));
-                            box-shadow: 5px 5px 15px rgba(0, 0, 0, 0.2);
-                        }}
-                    """)
-        frame.mousePressEvent = card_click
-
-        layout.addWidget(avatar_label)
-        layout.addWidget(name_label)
-        layout.addWidget(reg_label)
-        layout.addWidget(post_label)
-        frame.setLayout(layout)
-        frame.setCursor(QCursor(Qt.PointingHandCursor))
-        return frame
+    def show_user_menu(self, view, pos):
+        """用户右键菜单；帖子来自已爬取的所有帖子，按作者索引直接取出"""
+        index = view.indexAt(pos)
+        if not index.isValid():
+            return
+        role = UserListModel.UserRole if view is self.card_view else RecordTableModel.RecordRole
+        user = index.data(role)
+        posts = self.posts_of(user.id)
+        menu = QMenu(view)
+        posts_action = menu.addAction(f"查看 {user.name} 的帖子（{len(posts)} 篇）")
+        posts_action.setEnabled(bool(posts))
+        page_action = menu.addAction("打开用户主页")
+        action = menu.exec_(view.viewport().mapToGlobal(pos))
+        if action is posts_action:
+            self.display_posts(posts, f"{user.name} 的帖子")
+        elif action is page_action:
+            self.open_user_page(user.id)
 
     def show_cmd_dialog(self, event): 
         if event.type() == event.MouseButtonDblClick:
@@ -762,41 +1065,170 @@ class CensusApp(QWidget):
         self.cookie = cookie
 
     def update_data(self):
+        # 同一 Cookie 的爬取正在进行时合并到该任务；否则立即取代旧任务，不等待它结束
+        thread = self.jobs.submit("users", self.cookie, self.create_users_job)
+        if thread is None:
+            return
         self.progress_bar.setValue(0)
         self.progress_bar.setFormat("爬取进度：%v/%m")
         self.progress_bar.show()
 
-        # 使用线程进行数据爬取
-        if self.crawl_thread and self.crawl_thread.isRunning():
-            self.crawl_thread.quit()
-            self.crawl_thread.wait()
-            
-        self.crawl_thread = UserCrawlThread(self.cookie)
-        self.crawl_thread.progress.connect(self.update_progress)
-        self.crawl_thread.finished.connect(self.on_crawl_finished)
-        self.crawl_thread.start()
-
-    def update_progress(self, current, total):
-        self.progress_bar.setMaximum(total)
-        self.progress_bar.setValue(current)
-        QApplication.processEvents()
-
-    def on_crawl_finished(self, users):
-        self.users = users
-        self.progress_bar.setFormat("爬取完成！")
+    def closeEvent(self, event):
+        # 先隐藏窗口，再等爬取线程跑完手上的请求退出，用户看不到等待
+        self.hide()
+        self.avatar_pipeline.shutdown()
+        self.avatar_renderer.shutdown()
+        self.jobs.shutdown()
+        super().closeEvent(event)
+
+    def create_users_job(self):
+        if async_backend_available():
+            thread = AsyncCrawlThread(self.cookie)
+            thread.posts_batch.connect(self.on_posts_batch)
+            thread.posts_finished.connect(self.on_all_posts_finished)
+        else:
+            thread = UserCrawlThread(self.cookie, incremental=self.use_incremental("users", self.users))
+        thread.progress.connect(self.update_progress)
+        thread.batch.connect(self.on_users_batch)
+        thread.finished.connect(self.on_crawl_finished)
+        return thread
+
+    def use_incremental(self, kind, snapshot):
+        """已有本地快照且距上次全量爬取未超过 FULL_CRAWL_INTERVAL 时只抓增量"""
+        return INCREMENTAL_UPDATE and bool(snapshot) and not needs_full_crawl(kind)
+
+    def update_progress(self, state):
+        if not self.jobs.is_current("users", self.sender()):
+            return
+        # 进度已在爬虫线程里节流，这里只更新控件，由事件循环正常重绘
+        self.show_progress(self.progress_bar, "爬取进度", state)
+
+    def show_progress(self, bar, label, state):
+        """总数未知时以已完成数作为最大值"""
+        bar.setMaximum(state["total"] or state["done"])
+        bar.setValue(state["done"])
+        bar.setFormat(f"{label}：{format_progress(state)}")
+
+    def set_users(self, users):
+        """替换用户数据，并把缺少本地头像的用户交给头像流水线"""
+        self.users = RecordList(users)
+        users = self.users
+        self.name_index = NameIndex(users)
+        self.sort_orders = SortOrders(users, USER_SORT_KEYS)
+        self.avatar_pipeline.submit(self.without_avatar(users))
+
+    def keep_known_avatars(self, users):
+        """爬虫线程只知道头像地址，本地头像路径在界面的用户记录上；
+        头像地址没变的已有用户沿用本地头像，避免卡片闪回占位图、整批重新排队下载"""
+        for user in users:
+            known = self.users.get(user.id)
+            if known is not None and known.avatar_url == user.avatar_url:
+                user.avatar = known.avatar
+        return users
+
+    def without_avatar(self, users):
+        return [u for u in users if not u.avatar or u.avatar == DEFAULT_AVATAR]
+
+    def on_avatar_ready(self, user_id, path):
+        user = self.users.get(user_id)
+        if user:
+            user.avatar = path
+        if hasattr(self, "card_model"):
+            self.card_model.user_changed(user_id)
+
+    def on_users_batch(self, users):
+        if not self.jobs.is_current("users", self.sender()):
+            return
+        self.pending_users.extend(users)
+        if not self.stream_timer.isActive():
+            self.stream_timer.start()
+
+    def on_posts_batch(self, posts):
+        if not (self.jobs.is_current("posts", self.sender()) or self.jobs.is_current("users", self.sender())):
+            return
+        self.pending_posts.extend(posts)
+        if not self.stream_timer.isActive():
+            self.stream_timer.start()
+
+    def flush_stream(self):
+        """把缓冲区里的用户和帖子合并进当前数据，每个周期只刷新一次界面"""
+        users, self.pending_users = self.pending_users, []
+        posts, self.pending_posts = self.pending_posts, []
+        if users:
+            self.users.upsert(self.keep_known_avatars(users))
+            self.name_index = NameIndex(self.users)
+            self.sort_orders = SortOrders(self.users, USER_SORT_KEYS)
+            self.avatar_pipeline.submit(self.without_avatar(users))
+            if hasattr(self, "card_model"):
+                self.render_users()
+        if posts:
+            start = len(self.all_posts)
+            added = self.all_posts.upsert(posts)
+            if len(added) == len(posts):
+                posts_by_user(added, self.user_posts, start)
+            else:
+                self.associate_posts_with_users(self.all_posts)
+
+    def on_crawl_finished(self, users, complete):
+        if not self.jobs.is_current("users", self.sender()):
+            return
+        self.pending_users = []
+        # 增量结果来自本地存储的快照，其中没有解析好的头像路径
+        self.keep_known_avatars(users)
+        if complete:
+            self.set_users(users)
+            self.progress_bar.setFormat("爬取完成！")
+        else:
+            # 有页面抓取失败：只合并抓到的用户，不丢掉已有数据；下次更新从断点补抓
+            self.set_users(merge_records(list(self.users), users))
+            self.progress_bar.setFormat("部分页面抓取失败，下次更新时补抓")
         QTimer.singleShot(2000, self.progress_bar.hide)  # 2秒后隐藏进度条
         self.render_users()
         
-        # 在后台爬取所有帖子
-        self.crawl_all_posts_background()
+        # 在后台爬取所有帖子（asyncio 后端已在同一事件循环里一并抓取）
+        if not isinstance(self.sender(), AsyncCrawlThread):
+            self.crawl_all_posts_background()
 
     def crawl_all_posts_background(self):
-        """后台爬取所有论坛帖子"""
-        def progress_callback(current, total, message=None):
-            # 后台爬取，不显示进度条
-            QApplication.processEvents()
+        """后台爬取所有论坛帖子；旧任务被取代，它之后发出的信号会被忽略"""
+        thread = self.jobs.submit("posts", self.cookie, self.create_posts_job)
+        if thread is None:
+            return
+        self.all_posts_progress_bar.setValue(0)
+        self.all_posts_progress_bar.setFormat("所有帖子爬取进度：%v/%m")
+        self.all_posts_progress_bar.show()
+        self.cancel_all_posts_btn.show()
 
-        self.all_posts = crawl_all_posts(self.cookie, progress_callback)
+    def create_posts_job(self):
+        incremental = self.use_incremental("discussions", self.all_posts)
+        thread = AllPostsCrawlThread(self.cookie, self, incremental=incremental)
+        thread.progress.connect(self.update_all_posts_progress)
+        thread.batch.connect(self.on_posts_batch)
+        thread.finished.connect(self.on_all_posts_finished)
+        return thread
+
+    def cancel_all_posts_crawl(self):
+        # 线程在下一次请求前自行退出，界面不等待
+        self.jobs.cancel("posts")
+        self.all_posts_progress_bar.hide()
+        self.cancel_all_posts_btn.hide()
+
+    def update_all_posts_progress(self, state):
+        if not self.jobs.is_current("posts", self.sender()):
+            return
+        self.show_progress(self.all_posts_progress_bar, "所有帖子爬取进度", state)
+
+    def on_all_posts_finished(self, posts, complete):
+        if isinstance(self.sender(), AllPostsCrawlThread):
+            if not self.jobs.is_current("posts", self.sender()):
+                return
+            self.all_posts_progress_bar.setFormat("所有帖子爬取完成！" if complete else "部分帖子页面抓取失败，下次更新时补抓")
+            self.cancel_all_posts_btn.hide()
+            QTimer.singleShot(2000, self.all_posts_progress_bar.hide)
+        self.pending_posts = []
+        if not complete:
+            posts = merge_records(list(self.all_posts), posts)
+        self.all_posts = RecordList(posts)
         # 爬取完成后关联帖子与用户
         self.associate_posts_with_users(self.all_posts)
 
@@ -806,29 +1238,24 @@ class CensusApp(QWidget):
         self.display_all_posts()
 
     def associate_posts_with_users(self, posts):
-        """将帖子与用户关联"""
-        # 清空之前的关联
-        for user in self.users:
-            user['post_list'] = []
-            
-        # 建立用户ID到用户对象的映射
-        user_map = {user['id']: user for user in self.users}
-        
-        # 为每个帖子找到对应的用户
-        for post in posts:
-            user_id = post.get('userId')  # 假设API返回中包含userId字段
-            if user_id and user_id in user_map:
-                user_map[user_id]['post_list'].append(post)
-                
-        # 更新用户发帖数（如果需要）
-        for user in self.users:
-            if 'post_list' in user:
-                user['posts'] = len(user['post_list'])
+        """将帖子与用户关联：按帖子记录的作者 id 一次遍历分组
+
+        用户的发帖数来自用户接口（主题数 + 回复数），这里只建立帖子索引，不覆盖它
+        """
+        self.user_posts = posts_by_user(posts)
+
+    def posts_of(self, user_id):
+        """某个用户发表的主题帖"""
+        return [self.all_posts[row] for row in self.user_posts.get(user_id, ())]
 
     def display_all_posts(self):
         """显示所有帖子对话框"""
+        self.display_posts(self.all_posts, "所有帖子")
+
+    def display_posts(self, posts, title):
+        """帖子列表对话框：所有帖子或某个用户的帖子"""
         dialog = QDialog(self)
-        dialog.setWindowTitle("所有帖子")
+        dialog.setWindowTitle(title)
         dialog.resize(1280, 720)
         dialog.setStyleSheet("""
             QDialog {
@@ -841,7 +1268,8 @@ class CensusApp(QWidget):
         layout.setSpacing(15)
         
         # 添加标题
-        title_label = QLabel(f"所有帖子 (共{len(self.all_posts)}篇)")
+        title_label = QLabel(f"{title} (共{len(posts)}篇)")
+        title_label.setProperty("title", title)
         title_label.setAlignment(Qt.AlignCenter)
         title_label.setStyleSheet("""
             QLabel {
@@ -880,23 +1308,34 @@ class CensusApp(QWidget):
             }
         """)
         self.sort_time_btn.clicked.connect(lambda: self.toggle_post_time_sort(posts_table, title_label))
+        # 按标题筛选帖子
+        post_search_input = QLineEdit()
+        post_search_input.setPlaceholderText("搜索标题...")
+        post_search_input.setStyleSheet("""
+            QLineEdit {
+                background: rgba(255,255,255,0.7);
+                border: 1px solid rgba(255,255,255,0.5);
+                border-radius: 10px;
+                color: #333;
+                font-size: 15px;
+                padding: 10px 20px;
+            }
+        """)
+        post_search_input.textChanged.connect(lambda text: self.filter_posts(posts_table, title_label, text))
+        sort_layout.addWidget(post_search_input)
         self.sort_time_btn.setProperty("sort_order", True)  # True = ascending
         sort_layout.addWidget(self.sort_time_btn)
         sort_layout.addStretch()
         layout.addLayout(sort_layout)
         
         # 添加表格显示帖子
-        posts_table = QTableWidget()
-        posts_table.setColumnCount(4)
-        posts_table.setHorizontalHeaderLabels(["ID", "标题", "发布时间", "评论数"])
-        posts_table.setRowCount(len(self.all_posts))
-        posts_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
-        posts_table.setSelectionBehavior(QAbstractItemView.SelectRows)
-        posts_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        posts_model = PostTableModel(dialog)
+        posts_model.set_records(posts)
+        posts_table = make_table_view(posts_model)
         
         # 美化表格
         posts_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background: rgba(255, 255, 255, 0.85);
                 border-radius: 15px;
                 font-size: 16px;
@@ -904,7 +1343,7 @@ class CensusApp(QWidget):
                 gridline-color: rgba(200, 200, 200, 0.5);
                 margin: 10px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 12px;
                 border-bottom: 1px solid rgba(200, 200, 200, 0.3);
             }
@@ -917,22 +1356,18 @@ class CensusApp(QWidget):
                 border: none;
                 border-radius: 0px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: rgba(100, 149, 237, 0.4);
             }
         """)
         
         # 添加双击事件处理，打开帖子详情页面
-        def open_post_detail(item):
-            if item.column() >= 0:  # 点击任意列都可打开详情
-                row = item.row()
-                post_id = self.all_posts[row]["id"]
-                webbrowser.open(f"https://bbs.wtfxxjr.top/d/{post_id}")
+        def open_post_detail(index):
+            post = index.data(RecordTableModel.RecordRole)  # 点击任意列都可打开详情
+            if post:
+                webbrowser.open(f"https://bbs.wtfxxjr.top/d/{post.id}")
         
-        posts_table.itemDoubleClicked.connect(open_post_detail)
-        
-        # 填充数据
-        self.populate_posts_table(posts_table, self.all_posts)
+        posts_table.doubleClicked.connect(open_post_detail)
         
         layout.addWidget(posts_table)
         
@@ -977,41 +1412,16 @@ class CensusApp(QWidget):
         # 更新按钮文本
         sort_btn.setText(f"按时间排序 {'↑' if ascending else '↓'}")
         
-        # 对帖子进行排序
-        sorted_posts = sorted(self.all_posts, 
-                             key=lambda x: x["created_at"], 
-                             reverse=not ascending)
-        
-        # 更新表格内容
-        self.populate_posts_table(table, sorted_posts)
+        # 设置表头排序标记，由模型对“发布时间”列排序
+        table.horizontalHeader().setSortIndicator(2, Qt.AscendingOrder if ascending else Qt.DescendingOrder)
         
         # 更新标题
-        title_label.setText(f"所有帖子 (共{len(sorted_posts)}篇)")
-    
-    def populate_posts_table(self, table, posts_data):
-        """填充帖子表格数据"""
-        table.setRowCount(len(posts_data))
-        
-        for row, post in enumerate(posts_data):
-            # ID列
-            id_item = QTableWidgetItem(post["id"])
-            id_item.setTextAlignment(Qt.AlignCenter)
-            table.setItem(row, 0, id_item)
-            
-            # 标题列
-            title_item = QTableWidgetItem(post["title"])
-            title_item.setTextAlignment(Qt.AlignCenter)
-            table.setItem(row, 1, title_item)
-            
-            # 发布时间列
-            date_item = QTableWidgetItem(post["created_at"])
-            date_item.setTextAlignment(Qt.AlignCenter)
-            table.setItem(row, 2, date_item)
-            
-            # 评论数列
-            comment_item = QTableWidgetItem(str(post["comment_count"]))
-            comment_item.setTextAlignment(Qt.AlignCenter)
-            table.setItem(row, 3, comment_item)
+        title_label.setText(f"{title_label.property('title')} (共{table.model().rowCount()}篇)")
+
+    def filter_posts(self, table, title_label, text):
+        """按标题筛选帖子"""
+        table.model().set_filter_text(text)
+        title_label.setText(f"{title_label.property('title')} (共{table.model().rowCount()}篇)")
     
 # =================== 启动 ===================
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+# 对比默认分页 / 完整资源 与 大分页 / 稀疏字段集 两种请求方式的请求数与传输字节数
+# 用法（在仓库根目录运行，需要能访问论坛）：
+#   python benchmarks/bench_api_payload.py [--cookie COOKIE] [--max-pages N]
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wfmc_core import api_url
+from wfmc_http import HttpClient
+
+# 改动前的地址：默认每页 20 条，返回完整的 JSON:API 资源
+LEGACY = {
+    "users": "https://bbs.wtfxxjr.top/api/users?page[number]={}",
+    "discussions": "https://bbs.wtfxxjr.top/api/discussions?page[number]={}",
+}
+OPTIMIZED = {
+    "users": api_url("users"),
+    "discussions": api_url("discussions"),
+}
+
+
+def walk(client, url_template, max_pages):
+    """逐页请求直到空页或达到页数上限，返回记录数和耗时"""
+    records = 0
+    start = time.perf_counter()
+    for page in range(1, max_pages + 1):
+        resp = client.get(url_template.format(page))
+        if resp.status_code != 200:
+            break
+        data = resp.json().get("data", [])
+        if not data:
+            break
+        records += len(data)
+    return records, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cookie", default="")
+    parser.add_argument("--max-pages", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'资源':<12}{'方式':<10}{'记录数':>8}{'请求数':>8}{'字节数':>12}{'耗时(s)':>10}")
+    for resource in ("users", "discussions"):
+        for label, templates in (("before", LEGACY), ("after", OPTIMIZED)):
+            client = HttpClient(args.cookie)
+            records, elapsed = walk(client, templates[resource], args.max_pages)
+            stats = client.stats
+            print(f"{resource:<12}{label:<10}{records:>8}{stats['requests']:>8}{stats['bytes']:>12}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
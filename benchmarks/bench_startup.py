@@ -0,0 +1,80 @@
+# 测量 GUI 启动开销：python -X importtime 统计的导入耗时，以及从解释器开始执行到主窗口第一次绘制的时间
+# 用法（在仓库根目录运行，需要 PyQt5；无显示器时可设置 QT_QPA_PLATFORM=offscreen）：
+#   python benchmarks/bench_startup.py [--runs N] [--top K]
+import argparse, os, statistics, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程里创建窗口，窗口第一次收到绘制事件时打印经过的秒数
+FIRST_PAINT = """
+import time
+start = time.perf_counter()
+import sys
+from PyQt5.QtCore import QObject, QEvent, QTimer
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+import WFMC
+win = WFMC.CensusApp()
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            print(time.perf_counter() - start)
+            app.quit()
+        return False
+
+win.installEventFilter(FirstPaint(win))
+win.show()
+QTimer.singleShot(30000, app.quit)
+app.exec_()
+"""
+
+
+def import_times(module):
+    """返回 (该模块的累计导入耗时, [(累计耗时, 模块名)])，单位为秒"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us) / 1e6, name.strip()))
+    total = next((t for t, name in rows if name == module), 0.0)
+    return total, sorted(rows, reverse=True)
+
+
+def first_paint():
+    proc = subprocess.run([sys.executable, "-c", FIRST_PAINT], cwd=ROOT, capture_output=True, text=True)
+    try:
+        return float(proc.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        sys.stderr.write(proc.stderr)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        total, rows = import_times("WFMC")
+        totals.append(total)
+    print(f"import WFMC: 中位数 {statistics.median(totals) * 1000:.0f} ms（{args.runs} 次）")
+    print(f"{'累计(ms)':>10}  模块")
+    for seconds, name in rows[:args.top]:
+        print(f"{seconds * 1000:>10.1f}  {name}")
+    for heavy in ("cv2", "aiohttp", "pypinyin"):
+        if any(name == heavy for _, name in rows):
+            print(f"警告：启动时导入了 {heavy}")
+
+    paints = [t for t in (first_paint() for _ in range(args.runs)) if t is not None]
+    if paints:
+        print(f"首次绘制: 中位数 {statistics.median(paints) * 1000:.0f} ms（{len(paints)} 次）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# asyncio 爬取引擎：在一个事件循环里并发抓取用户页、帖子页和头像，
+# 作为 QThread 爬虫之外的可选后端，GUI 通过单个桥接线程驱动
+import asyncio, math, time
+from urllib.parse import urlsplit
+
+try:
+    import aiohttp
+except ImportError:  # 未安装 aiohttp 时只能使用线程后端
+    aiohttp = None
+
+from wfmc_core import (
+    BASE_URL, ALL_POSTS_URL, CRAWL_RATE_LIMIT, parse_user, parse_discussion
+)
+from wfmc_avatar import get_avatar_cache
+from wfmc_http import FORUM_HOST, USER_AGENT, DEFAULT_TIMEOUT, RETRY_TOTAL, RETRY_BACKOFF, RETRY_STATUS
+from wfmc_throttle import THROTTLE_STATUS, retry_after_seconds
+
+ASYNC_CONCURRENCY = 32     # 事件循环内同时在途的请求数
+
+
+def available():
+    return aiohttp is not None
+
+
+class AsyncTokenBucket:
+    """令牌桶限速的协程版本"""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncCrawlEngine:
+    def __init__(self, cookie="", concurrency=ASYNC_CONCURRENCY, rate_limit=CRAWL_RATE_LIMIT, progress=None, on_batch=None,
+                 should_stop=None):
+        if aiohttp is None:
+            raise RuntimeError("asyncio 爬取引擎需要安装 aiohttp")
+        self.cookie = cookie
+        self.concurrency = max(1, concurrency)
+        self.limiter = AsyncTokenBucket(rate_limit)
+        self.progress = progress  # progress(kind, current, total)
+        self.on_batch = on_batch  # on_batch(kind, records)，每到一页调用一次
+        self.should_stop = should_stop  # 返回 True 后不再发出新请求
+        self.failed = set()  # 有页面重试后仍失败的种类（"users" / "posts"），结果不完整
+        self.session = None
+        self.semaphore = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            headers={"User-Agent": USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def report(self, kind, current, total):
+        if self.progress:
+            self.progress(kind, current, total)
+
+    async def request(self, url, parse_json=True):
+        """带限速和重试的 GET，返回 JSON 或字节；失败返回 None"""
+        headers = {}
+        if self.cookie and urlsplit(url).hostname == FORUM_HOST:
+            headers["Cookie"] = self.cookie
+        for attempt in range(RETRY_TOTAL + 1):
+            if self.should_stop and self.should_stop():
+                return None
+            await self.limiter.acquire()
+            try:
+                async with self.semaphore:
+                    async with self.session.get(url, headers=headers) as resp:
+                        if resp.status == 200:
+                            return await resp.json(content_type=None) if parse_json else await resp.read()
+                        if resp.status not in RETRY_STATUS + THROTTLE_STATUS:
+                            return None
+                        retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                retry_after = None
+            delay = RETRY_BACKOFF * (2 ** attempt)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            await asyncio.sleep(delay)
+        return None
+
+    def parse_page(self, kind, data, parse):
+        records = [r for r in map(parse, data) if r]
+        if self.on_batch and records:
+            self.on_batch(kind, records)
+        return records
+
+    def page_failed(self, kind):
+        # 被取消导致的空结果不算失败
+        if not (self.should_stop and self.should_stop()):
+            self.failed.add(kind)
+
+    async def crawl_collection(self, url_template, parse, kind):
+        """先取第一页得到总数，再并发抓取其余页面，按页序返回记录；失败的页面记入 self.failed"""
+        first = await self.request(url_template.format(1))
+        if first is None:
+            self.page_failed(kind)
+        if not first or not first.get("data"):
+            return []
+        total = first.get("meta", {}).get("total", 0)
+        page_size = len(first["data"])
+        pages = {1: self.parse_page(kind, first["data"], parse)}
+        count = page_size
+        self.report(kind, count, total)
+
+        async def fetch(page):
+            nonlocal count
+            body = await self.request(url_template.format(page))
+            if body is None:
+                self.page_failed(kind)
+            data = body.get("data", []) if body else []
+            pages[page] = self.parse_page(kind, data, parse)
+            count += len(data)
+            self.report(kind, count, total)
+
+        if total:
+            await asyncio.gather(*(fetch(p) for p in range(2, math.ceil(total / page_size) + 1)))
+        else:
+            page = 2
+            while True:
+                await fetch(page)
+                # 总数未知时失败的一页之后无法判断是否还有数据，到此为止并记为不完整
+                if not pages[page] or kind in self.failed:
+                    break
+                page += 1
+
+        records = []
+        for page in sorted(pages):
+            records.extend(pages[page])
+        return records
+
+    async def crawl_users(self):
+        return await self.crawl_collection(BASE_URL, parse_user, "users")
+
+    async def crawl_discussions(self):
+        return await self.crawl_collection(ALL_POSTS_URL, parse_discussion, "posts")
+
+    async def fetch_avatar(self, user):
+        # 头像缓存负责条件请求和去重，放到默认线程池里执行以免阻塞事件循环
+        async with self.semaphore:
+            path = await asyncio.get_running_loop().run_in_executor(None, get_avatar_cache().get, user.avatar_url)
+        if path:
+            user.avatar = path
+
+    async def fetch_avatars(self, users):
+        done = 0
+
+        async def fetch(user):
+            nonlocal done
+            await self.fetch_avatar(user)
+            done += 1
+            self.report("avatars", done, len(users))
+
+        await asyncio.gather(*(fetch(u) for u in users))
+
+    async def census(self, with_posts=True, with_avatars=True):
+        """一次完整的统计：用户页与帖子页同时抓取，用户到齐后并发下载头像"""
+        async def users_with_avatars():
+            users = await self.crawl_users()
+            if with_avatars:
+                await self.fetch_avatars(users)
+            return users
+
+        if not with_posts:
+            return await users_with_avatars(), []
+        users, posts = await asyncio.gather(users_with_avatars(), self.crawl_discussions())
+        return users, posts
+
+
+def run_census(cookie="", progress=None, with_posts=True, with_avatars=True, on_batch=None, **kwargs):
+    """同步入口：在当前线程新建事件循环跑完整次统计，返回 (users, posts, failed)
+
+    failed 为有页面抓取失败的种类集合（"users" / "posts"），其中的结果不完整，不应替换本地数据
+    """
+    async def main():
+        async with AsyncCrawlEngine(cookie, progress=progress, on_batch=on_batch, **kwargs) as engine:
+            users, posts = await engine.census(with_posts, with_avatars)
+            return users, posts, engine.failed
+    return asyncio.run(main())
@@ -0,0 +1,108 @@
+# 头像缓存：按头像地址索引，文件按内容哈希命名（相同图片只存一份），
+# 用 ETag / Last-Modified 做条件请求，头像未变化时服务器只返回 304
+import hashlib, os, threading, time
+
+from wfmc_core import AVATAR_DIR
+from wfmc_http import get_client
+from wfmc_store import Store, STORE_FILE
+
+# =================== 配置 ===================
+AVATAR_REVALIDATE_AFTER = 24 * 3600   # 超过这么久没检查过的头像才发条件请求
+CONTENT_TYPE_EXT = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/svg+xml": ".svg",
+}
+# 没有 Content-Type 时按文件头判断格式
+MAGIC_EXT = (
+    (b"\x89PNG", ".png"),
+    (b"\xff\xd8", ".jpg"),
+    (b"GIF8", ".gif"),
+    (b"RIFF", ".webp"),
+)
+
+
+def guess_ext(content_type, content):
+    ext = CONTENT_TYPE_EXT.get((content_type or "").split(";")[0].strip().lower())
+    if ext:
+        return ext
+    for magic, ext in MAGIC_EXT:
+        if content.startswith(magic):
+            return ext
+    return ".img"
+
+
+class AvatarCache:
+    """线程安全；索引保存在本地存储的 avatars 表中"""
+    def __init__(self, directory=AVATAR_DIR, store_path=STORE_FILE, client=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.client = client or get_client()
+        self.lock = threading.Lock()
+        self.store = Store(store_path, shared=True)
+
+    def get(self, url, max_age=AVATAR_REVALIDATE_AFTER):
+        """返回头像的本地路径；下载失败且没有旧文件时返回 None"""
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        with self.lock:
+            entry = self.store.get_avatar(key)
+        path = os.path.join(self.directory, entry["file"]) if entry else None
+        if path and not os.path.exists(path):
+            entry, path = None, None
+        if entry and time.time() - (entry["checked_at"] or 0) < max_age:
+            return path
+
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            resp = self.client.get(url, headers=headers)
+        except Exception:
+            return path
+
+        if resp.status_code == 304 and entry:
+            entry["checked_at"] = time.time()
+            with self.lock:
+                self.store.put_avatar(entry)
+            return path
+        if resp.status_code != 200 or not resp.content:
+            return path
+
+        content = resp.content
+        content_type = resp.headers.get("Content-Type")
+        filename = hashlib.sha256(content).hexdigest() + guess_ext(content_type, content)
+        path = os.path.join(self.directory, filename)
+        if not os.path.exists(path):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        with self.lock:
+            self.store.put_avatar({
+                "url_hash": key,
+                "url": url,
+                "file": filename,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "size": len(content),
+                "content_type": content_type,
+                "checked_at": time.time(),
+            })
+        return path
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_avatar_cache():
+    """返回进程内共享的头像缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AvatarCache()
+        return _cache
@@ -0,0 +1,106 @@
+# WFMC 命令行模式：不导入 PyQt5 / cv2，可在无图形界面的服务器上定时运行
+# 用法：
+#   python WFMC.py crawl [--users] [--discussions] [--out FILE.json] [--no-store]
+#                        [--incremental] [--no-resume] [--concurrency N] [--rate-limit R] [--prefetch N] [--cookie COOKIE]
+# 不指定 --users / --discussions 时两者都爬取
+import argparse, json, sys
+
+from wfmc_core import CRAWL_CONCURRENCY, CRAWL_RATE_LIMIT, PAGE_PREFETCH, format_progress, load_cookie
+from wfmc_crawl import UserCrawler, crawl_all_posts
+from wfmc_records import record_dict
+from wfmc_store import STORE_FILE, save_crawl, load_snapshot, needs_full_crawl
+
+
+def print_progress(label, quiet):
+    """返回一个把进度快照写到 stderr 同一行的回调"""
+    def show(state):
+        if not quiet:
+            print(f"\r{label}：{format_progress(state)}", end="", file=sys.stderr, flush=True)
+    return show
+
+
+def use_incremental(args, kind):
+    return args.incremental and not needs_full_crawl(kind, path=args.store)
+
+
+def checkpoint_path(args):
+    """写入本地存储时同时保存断点，上次中断的爬取从已完成的页面继续"""
+    return None if args.no_store or args.no_resume else args.store
+
+
+def crawl_users(args, cookie):
+    crawler = UserCrawler(cookie, args.concurrency, args.rate_limit, args.prefetch, progress=print_progress("用户", args.quiet),
+                          checkpoint_path=checkpoint_path(args))
+    if use_incremental(args, "users"):
+        users, complete = crawler.crawl_incremental(load_snapshot("users", args.store))
+        full = False
+    else:
+        users, complete = crawler.crawl()
+        full = True
+    if not args.quiet:
+        print(file=sys.stderr)
+    if not args.no_store:
+        save_crawl(users=users, full=full, complete=complete, path=args.store)
+    return users, complete
+
+
+def crawl_discussions(args, cookie):
+    incremental = use_incremental(args, "discussions")
+    known = load_snapshot("discussions", args.store) if incremental else None
+    posts, complete = crawl_all_posts(cookie, known=known, concurrency=args.concurrency, rate_limit=args.rate_limit,
+                                      prefetch=args.prefetch, progress=print_progress("帖子", args.quiet),
+                                      checkpoint_path=checkpoint_path(args))
+    if not args.quiet:
+        print(file=sys.stderr)
+    if not args.no_store:
+        save_crawl(posts=posts, full=not incremental, complete=complete, path=args.store)
+    return posts, complete
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="WFMC.py", description="WTFXXJr 论坛用户获取工具（命令行模式）")
+    commands = parser.add_subparsers(dest="command", required=True)
+    crawl = commands.add_parser("crawl", help="爬取用户和/或帖子")
+    crawl.add_argument("--users", action="store_true", help="爬取用户")
+    crawl.add_argument("--discussions", action="store_true", help="爬取帖子")
+    crawl.add_argument("--out", help="把结果导出为 JSON 文件")
+    crawl.add_argument("--store", default=STORE_FILE, help=f"本地存储路径（默认 {STORE_FILE}）")
+    crawl.add_argument("--no-store", action="store_true", help="不写入本地存储")
+    crawl.add_argument("--no-resume", action="store_true", help="忽略上次中断留下的断点，从第 1 页重新爬取")
+    crawl.add_argument("--incremental", action="store_true", help="已有本地数据时只抓取新注册的用户和新增或有新回复的帖子")
+    crawl.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY, help="每个接口最多同时请求的页面数（自适应并发的上限）")
+    crawl.add_argument("--rate-limit", type=float, default=CRAWL_RATE_LIMIT, help="每个接口每秒最多发起的请求数")
+    crawl.add_argument("--prefetch", type=int, default=PAGE_PREFETCH, help="逐页抓取时提前发出的页面请求数")
+    crawl.add_argument("--cookie", help="论坛 Cookie，默认读取 cookie.json")
+    crawl.add_argument("--quiet", action="store_true", help="不输出进度")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cookie = args.cookie if args.cookie is not None else load_cookie()
+    if not (args.users or args.discussions):
+        args.users = args.discussions = True
+
+    result = {}
+    incomplete = []
+    for kind, crawl in (("users", crawl_users), ("discussions", crawl_discussions)):
+        if getattr(args, kind):
+            result[kind], complete = crawl(args, cookie)
+            if not complete:
+                incomplete.append(kind)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({kind: [record_dict(r) for r in records] for kind, records in result.items()},
+                      f, ensure_ascii=False, indent=2)
+    if not args.quiet:
+        print("，".join(f"{kind}: {len(records)}" for kind, records in result.items()), file=sys.stderr)
+    if incomplete:
+        # 失败不受 --quiet 影响：结果不完整时本地存储只合并不替换，下次运行从断点补抓
+        print(f"部分页面抓取失败，结果不完整：{'，'.join(incomplete)}", file=sys.stderr)
+    return 0 if all(result.values()) and not incomplete else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
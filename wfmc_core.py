@@ -0,0 +1,232 @@
+# WFMC 公共部分：接口地址、爬取参数和记录解析，不依赖 Qt，
+# 供线程爬虫与 asyncio 爬取引擎共用
+import os, json, time, threading
+
+from wfmc_records import UserRecord, PostRecord, day_number
+
+# =================== 配置 ===================
+API_ROOT = "https://bbs.wtfxxjr.top/api"
+# 每页条数，Flarum 列表接口允许的最大值为 50（默认只有 20）
+PAGE_LIMIT = 50
+# 稀疏字段集：只请求解析时用到的属性，置为 None 则返回完整资源
+API_FIELDS = {
+    "users": "username,avatarUrl,joinTime,discussionCount,commentCount",
+    # user 为作者关系，列在字段集里才会返回 relationships.user
+    "discussions": "title,createdAt,commentCount,user",
+}
+# 显式指定要包含的关系：资源 -> (include, 被包含资源的稀疏字段集)。
+# 不指定时 Flarum 会带上最后回复者、标签、首帖等一大串 included 资源；
+# 只包含作者并只取用户名，既保证有 relationships.user，又不让 included 把省下的字节吃回去
+API_INCLUDE = {
+    "discussions": ("user", {"users": "username"}),
+}
+
+
+def api_url(resource, sort=None, limit=None, fields=None, **filters):
+    """拼出分页接口地址模板，页码位置保留为 {}
+
+    limit / fields 不传时使用 PAGE_LIMIT / API_FIELDS，传入 fields="" 可关闭稀疏字段集
+    （同时不再指定 API_INCLUDE，返回接口默认的完整资源）
+    """
+    query = [f"filter[{key}]={value}" for key, value in filters.items()]
+    query.append("page[number]={}")
+    query.append(f"page[limit]={limit or PAGE_LIMIT}")
+    fields = API_FIELDS.get(resource) if fields is None else fields
+    if fields:
+        query.append(f"fields[{resource}]={fields}")
+        include, included_fields = API_INCLUDE.get(resource, (None, {}))
+        if include:
+            query.append(f"include={include}")
+        for kind, kind_fields in included_fields.items():
+            query.append(f"fields[{kind}]={kind_fields}")
+    if sort:
+        query.append(f"sort={sort}")
+    return f"{API_ROOT}/{resource}?" + "&".join(query)
+
+
+BASE_URL = api_url("users")
+# 添加帖子API基础URL
+POSTS_URL = api_url("discussions", author="{}")
+# 添加获取所有帖子的URL
+ALL_POSTS_URL = api_url("discussions")
+# 增量更新用：最新注册的用户 / 最近有回复的帖子排在最前。
+# 用户按注册时间排序，增量只能发现新成员，老成员的帖子数变化要等下一次全量爬取
+USERS_NEWEST_URL = api_url("users", sort="-joinedAt")
+ALL_POSTS_RECENT_URL = api_url("discussions", sort="-lastPostedAt")
+COOKIE_FILE = "cookie.json"
+AVATAR_DIR = "assets/avatar/"
+DEFAULT_AVATAR = "https://d.feiliupan.com/t/103549985525600256/user.png"
+# 爬取并发与限速
+CRAWL_CONCURRENCY = 8      # 每个接口最多同时请求的页面数（自适应窗口的上限，见 wfmc_throttle）
+CRAWL_RATE_LIMIT = 10.0    # 每个接口每秒最多发起的请求数（令牌桶），实际速度由自适应限流决定
+PAGE_PREFETCH = 2          # 逐页抓取时提前发出的后续页面请求数（跟随 links.next 时最多 1）
+PROGRESS_INTERVAL = 0.2    # 进度最多每隔这么久上报一次（秒）
+
+# =================== 工具函数 ===================
+def load_cookie(path=COOKIE_FILE):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("cookie", "")
+    return ""
+
+def save_cookie(cookie, path=COOKIE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"cookie": cookie}, f, ensure_ascii=False, indent=4)
+
+
+# 令牌桶限速，替代固定的 sleep，多个线程共享
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill()
+            self.rate = rate
+            self.capacity = max(1.0, rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+# =================== 进度汇总 ===================
+# 爬虫线程只更新计数，按时间节流后才把进度快照交给回调（界面信号或命令行输出）
+class ProgressTracker:
+    def __init__(self, callback=None, interval=PROGRESS_INTERVAL, client=None):
+        self.callback = callback  # callback(state)，state 为 snapshot() 返回的字典
+        self.interval = interval
+        self.client = client  # 传入 HttpClient 时附带传输字节数
+        self.lock = threading.Lock()
+        self.done = 0
+        self.total = 0
+        self.pages = 0
+        self.in_flight = 0
+        self.bytes_start = client.stats["bytes"] if client else 0
+        self.started = time.monotonic()
+        self.last_report = 0.0
+
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def set_total(self, total):
+        with self.lock:
+            self.total = total or 0
+
+    def advance(self, records, pages=1):
+        """记一页（或几页）完成，随后按节流间隔上报"""
+        with self.lock:
+            self.done += records
+            self.pages += pages
+        self.report()
+
+    def set_done(self, done, total=None):
+        with self.lock:
+            self.done = done
+            if total is not None:
+                self.total = total
+        self.report()
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            remaining = self.total - self.done if self.total > self.done else 0
+            return {
+                "done": self.done,
+                "total": self.total,
+                "pages": self.pages,
+                "in_flight": self.in_flight,
+                "bytes": self.client.stats["bytes"] - self.bytes_start if self.client else 0,
+                "elapsed": elapsed,
+                "rate": rate,  # 条/秒
+                "eta": remaining / rate if rate > 0 and remaining else None,
+            }
+
+    def report(self, force=False):
+        """距上次上报不足 interval 时直接返回；force 用于结束时的最后一次上报"""
+        if not self.callback:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self.last_report < self.interval:
+                return
+            self.last_report = now
+        self.callback(self.snapshot())
+
+def format_progress(state):
+    """把进度快照格式化为 "123/456  41 条/秒  剩余 7s" 形式的文字"""
+    text = f"{state['done']}/{state['total']}" if state["total"] else f"{state['done']}"
+    if state["rate"]:
+        text += f"  {state['rate']:.0f} 条/秒"
+    if state["eta"] is not None:
+        text += f"  剩余 {state['eta']:.0f}s"
+    if state["bytes"]:
+        text += f"  {state['bytes'] / 1024:.0f} KB"
+    return text
+
+# =================== 增量合并 ===================
+# 判断记录是否变化时比较的字段。用户增量按注册时间倒序，遇到第一个已知且未变化的成员就停止，
+# 这里的字段只会刷新排在它前面的新近成员，不能发现更早注册成员的变化
+USER_COMPARE_FIELDS = ("name", "posts")
+# 含 user_id：旧缓存中缺少作者的帖子会在下次增量更新时重新抓取
+POST_COMPARE_FIELDS = ("title", "comment_count", "user_id")
+
+def is_unchanged(known, record, fields):
+    return known is not None and all(getattr(known, f) == getattr(record, f) for f in fields)
+
+def merge_records(known, delta):
+    """把增量记录合并进已有数据：新增或变化的记录排在前面，其余保持原顺序"""
+    delta_ids = {r.id for r in delta}
+    return delta + [r for r in known if r.id not in delta_ids]
+
+# =================== 记录解析 ===================
+def parse_user(u):
+    """把接口返回的用户资源转换为用户记录，跳过 id 为 4 的账号"""
+    if u["id"] == "4":
+        return None
+    attr = u["attributes"]
+    return UserRecord(
+        u["id"],
+        attr["username"],
+        attr.get("avatarUrl") or DEFAULT_AVATAR,
+        DEFAULT_AVATAR,
+        day_number(attr["joinTime"][:10]),
+        attr.get("discussionCount", 0) + attr.get("commentCount", 0)
+    )
+
+def relationship_id(resource, name):
+    """读取 JSON:API 一对一关系的目标 id，没有该关系时返回 None"""
+    data = ((resource.get("relationships") or {}).get(name) or {}).get("data")
+    return data.get("id") if data else None
+
+def parse_discussion(p):
+    """把接口返回的帖子资源转换为帖子记录，作者取自 relationships.user"""
+    attr = p["attributes"]
+    return PostRecord(
+        p["id"],
+        attr.get("title", "无标题"),
+        day_number((attr.get("createdAt") or "")[:10]),
+        attr.get("commentCount", 0),
+        relationship_id(p, "user")
+    )
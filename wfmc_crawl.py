@@ -0,0 +1,250 @@
+# 不依赖 Qt 的爬取逻辑：界面里的 QThread 与命令行模式共用
+# 用户、帖子、某个用户的帖子三种爬取都建立在同一个分页引擎 PaginatedResource 上，
+# 限速、并发、进度、分批回调、取消和断点续爬只在这里实现一次
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import requests
+
+from wfmc_core import (
+    BASE_URL, POSTS_URL, ALL_POSTS_URL, USERS_NEWEST_URL, ALL_POSTS_RECENT_URL,
+    CRAWL_CONCURRENCY, CRAWL_RATE_LIMIT, PAGE_PREFETCH, USER_COMPARE_FIELDS, POST_COMPARE_FIELDS,
+    ProgressTracker, parse_user, parse_discussion, is_unchanged, merge_records
+)
+from wfmc_http import get_client, endpoint_of
+from wfmc_store import Checkpoint
+from wfmc_throttle import get_limiter
+
+
+# 通用分页抓取：第一页同时给出总数，按页码翻页时其余页面交给有界线程池并发抓取；
+# 没有总数、需要中途停止或按 links.next 翻页时逐页抓取，解析当前页的同时预取后续页面，
+# 并以 links.next 缺失 / 总页数判断最后一页，不再多发一个空页请求。
+# 传入 checkpoint_path 时每完成一页写一次断点，下次爬取同一地址时只请求还没完成的页面
+class PaginatedResource:
+    def __init__(self, url_template, parse, cookie="", strategy="offset",
+                 concurrency=CRAWL_CONCURRENCY, rate_limit=CRAWL_RATE_LIMIT, prefetch=PAGE_PREFETCH,
+                 on_batch=None, progress=None, should_stop=None, stop_at=None, checkpoint_path=None):
+        self.url_template = url_template  # 页码位置为 {}
+        self.parse = parse  # 把一条资源转换为记录，返回 None 时跳过
+        self.strategy = strategy  # "offset" 按页码翻页，"next" 跟随响应中的 links.next
+        self.concurrency = max(1, concurrency)
+        self.prefetch = max(1, prefetch)
+        # 并发与速率由接口共享的自适应限流器控制，这里的参数作为该接口的预算
+        get_limiter(endpoint_of(url_template)).set_budget(self.concurrency, rate_limit)
+        self.client = get_client(cookie)
+        self.tracker = ProgressTracker(progress, client=self.client)
+        self.on_batch = on_batch  # on_batch(records)，每抓完一页调用一次
+        self.should_stop = should_stop  # 返回 True 时尽快结束，尚未发出的页面不再请求
+        self.stop_at = stop_at  # stop_at(record) 为 True 时在这条记录之前停止（增量爬取）
+        self.reached_stop = False
+        self.failed = False  # 有页面请求失败，断点保留给下次补抓
+        self.checkpoint = Checkpoint(url_template, checkpoint_path) if checkpoint_path else None
+        self.checkpointed = set()
+
+    def stopped(self):
+        return self.reached_stop or bool(self.should_stop and self.should_stop())
+
+    def fetch(self, url):
+        """请求一页并解析 JSON；状态码不是 200、网络错误或响应无法解析时返回 None"""
+        if self.stopped():
+            return None
+        self.tracker.request_started()
+        try:
+            resp = self.client.get(url, should_stop=self.stopped)
+            if resp.status_code != 200:
+                return None
+            return resp.json()
+        except (requests.RequestException, ValueError):
+            return None
+        finally:
+            self.tracker.request_finished()
+
+    def parse_page(self, body):
+        records = []
+        for item in body.get("data", []):
+            record = self.parse(item)
+            if record is None:
+                continue
+            if self.stop_at and self.stop_at(record):
+                self.reached_stop = True
+                break
+            records.append(record)
+        return records
+
+    @contextmanager
+    def executor(self, workers):
+        """线程池；停止后退出时不等待在途请求，它们在下一次等待限流或重试前自行放弃"""
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            yield pool
+        finally:
+            pool.shutdown(wait=not self.stopped(), cancel_futures=True)
+
+    def page_done(self, page, body):
+        """解析一页；开启断点时先把这一页的原始响应存下来"""
+        if self.checkpoint and page not in self.checkpointed:
+            self.checkpoint.save(page, body)
+            self.checkpointed.add(page)
+        return self.parse_page(body)
+
+    def iter_pages(self):
+        """按抓取完成的顺序产出 (页序号, 记录列表)，每页同时交给 on_batch 并计入进度"""
+        for page, records in self._pages():
+            if self.on_batch and records:
+                self.on_batch(records)
+            self.tracker.advance(len(records))
+            yield page, records
+        self.tracker.report(force=True)
+
+    def _pages(self):
+        saved = self.checkpoint.load() if self.checkpoint else {}
+        self.checkpointed = set(saved)
+        body = saved.get(1) or self.fetch(self.url_template.format(1))
+        if not body or not body.get("data"):
+            self.failed = body is None and not self.stopped()
+            return
+        saved[1] = body
+        total = body.get("meta", {}).get("total", 0)
+        last_page = math.ceil(total / len(body["data"])) if total else None
+        self.tracker.set_total(total)
+        if self.strategy == "offset" and total and not self.stop_at:
+            # 续爬时先交出已保存的页面，只请求缺少的页
+            for page in sorted(saved):
+                yield page, self.page_done(page, saved[page])
+            yield from self._concurrent_pages([p for p in range(2, last_page + 1) if p not in saved])
+        else:
+            # 逐页抓取的断点从第 1 页起连续，重放到最后一页后从它的 links.next 继续
+            last = 1
+            while last + 1 in saved:
+                last += 1
+            for page in range(1, last):
+                yield page, self.page_done(page, saved[page])
+                if self.stopped():
+                    return
+            yield from self._sequential_pages(saved[last], last_page, last)
+
+    def _concurrent_pages(self, pages):
+        with self.executor(self.concurrency) as pool:
+            futures = {pool.submit(self.fetch, self.url_template.format(p)): p for p in pages}
+            for fut in as_completed(futures):
+                if self.stopped():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                body = fut.result()
+                if body is None:
+                    self.failed = True
+                yield futures[fut], self.page_done(futures[fut], body) if body else []
+
+    def next_url(self, body, page):
+        """下一页地址：跟随 links.next，没有时说明已是最后一页；响应不带 links 时按页码推算"""
+        links = body.get("links")
+        if links is not None:
+            return links.get("next")
+        return self.url_template.format(page + 1)
+
+    def _prefetch(self, pool, ahead, body, page, last_page):
+        """发出当前页之后的页面请求，已在途的不重复发"""
+        if self.strategy == "next" or last_page is None:
+            # 游标翻页要拿到当前页才知道下一页地址，最多预取一页
+            url = self.next_url(body, page) if not ahead else None
+            if url:
+                ahead.append((page + 1, pool.submit(self.fetch, url)))
+        else:
+            following = page + len(ahead) + 1
+            while len(ahead) < self.prefetch and following <= last_page:
+                ahead.append((following, pool.submit(self.fetch, self.url_template.format(following))))
+                following += 1
+
+    def _sequential_pages(self, body, last_page, page=1):
+        ahead = deque()  # 已发出的后续页面请求 (页序号, future)
+        with self.executor(self.prefetch) as pool:
+            while True:
+                if self.stop_at:
+                    # 增量爬取：当前页解析完且没遇到停止条件才预取，没有变化的日常更新只发一个请求
+                    records = self.page_done(page, body)
+                    if not self.stopped():
+                        self._prefetch(pool, ahead, body, page, last_page)
+                else:
+                    # 先发出后续页面的请求，再解析当前页，让解析与网络等待重叠
+                    self._prefetch(pool, ahead, body, page, last_page)
+                    records = self.page_done(page, body)
+                yield page, records
+                if self.stopped() or not ahead:
+                    break
+                page, fut = ahead.popleft()
+                body = fut.result()
+                if not body or not body.get("data"):
+                    self.failed = body is None and not self.stopped()
+                    break
+            for _, fut in ahead:
+                fut.cancel()
+
+    def crawl(self):
+        """抓取全部页面，按页序返回记录
+
+        续爬时前后两次之间数据可能移位，同一条记录出现两次时保留后抓到的
+        """
+        try:
+            pages = dict(self.iter_pages())
+            # 完整结束（包括增量爬取遇到停止条件）后断点作废；被取消或有页面失败时保留
+            if self.checkpoint and not self.failed and not (self.should_stop and self.should_stop()):
+                self.checkpoint.clear()
+        finally:
+            if self.checkpoint:
+                self.checkpoint.close()
+        records = {}
+        for page in sorted(pages):
+            for record in pages[page]:
+                records[record.id] = record
+        return list(records.values())
+
+
+def unchanged_since(known, fields):
+    """增量爬取的停止条件：遇到已知且未变化的记录"""
+    known_by_id = {r.id: r for r in known}
+    return lambda record: is_unchanged(known_by_id.get(record.id), record, fields)
+
+
+# 用户爬虫：全量按页码并发抓取；增量按注册时间倒序抓到第一条未变化的用户为止，
+# 只能补上新成员，老成员的帖子数等信息由 FULL_CRAWL_INTERVAL 定期的全量爬取更新。
+# 两种爬取都返回 (用户列表, 是否完整)，有页面请求失败时结果不完整，调用方不应拿它替换本地数据
+class UserCrawler:
+    def __init__(self, cookie="", concurrency=CRAWL_CONCURRENCY, rate_limit=CRAWL_RATE_LIMIT,
+                 prefetch=PAGE_PREFETCH, on_batch=None, progress=None, should_stop=None, checkpoint_path=None):
+        self.options = dict(cookie=cookie, concurrency=concurrency, rate_limit=rate_limit, prefetch=prefetch,
+                            on_batch=on_batch, progress=progress, should_stop=should_stop,
+                            checkpoint_path=checkpoint_path)
+
+    def crawl(self):
+        resource = PaginatedResource(BASE_URL, parse_user, **self.options)
+        return resource.crawl(), not resource.failed
+
+    def crawl_incremental(self, known):
+        """把新注册的用户合并进已有数据（不会发现老成员的变化）"""
+        stop_at = unchanged_since(known, USER_COMPARE_FIELDS)
+        resource = PaginatedResource(USERS_NEWEST_URL, parse_user, stop_at=stop_at, **self.options)
+        return merge_records(known, resource.crawl()), not resource.failed
+
+
+def crawl_user_posts(cookie, user_id, **options):
+    """爬取某个用户发表的帖子"""
+    return PaginatedResource(POSTS_URL.format(user_id, "{}"), parse_discussion, cookie, **options).crawl()
+
+
+def crawl_all_posts(cookie, known=None, **options):
+    """爬取所有帖子；传入 known 时按最近回复倒序只抓增量，遇到未变化的帖子即停止并合并
+
+    返回 (帖子列表, 是否完整)，有页面请求失败时结果不完整
+
+    options 原样传给 PaginatedResource（concurrency、rate_limit、prefetch、on_batch、progress、should_stop、
+    checkpoint_path）
+    """
+    if known is None:
+        resource = PaginatedResource(ALL_POSTS_URL, parse_discussion, cookie, **options)
+        return resource.crawl(), not resource.failed
+    stop_at = unchanged_since(known, POST_COMPARE_FIELDS)
+    resource = PaginatedResource(ALL_POSTS_RECENT_URL, parse_discussion, cookie, stop_at=stop_at, **options)
+    return merge_records(known, resource.crawl()), not resource.failed
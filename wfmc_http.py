@@ -0,0 +1,110 @@
+# WFMC 共享 HTTP 客户端：所有爬虫与头像下载都经由这里发请求，
+# 复用 keep-alive 连接池，省掉每次请求的 TCP+TLS 握手；每个请求都经过所属接口的自适应限流
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from wfmc_throttle import THROTTLE_RETRIES, get_limiter, retry_after_seconds
+
+# =================== 配置 ===================
+FORUM_HOST = "bbs.wtfxxjr.top"
+USER_AGENT = "CensusApp"
+DEFAULT_TIMEOUT = 10
+POOL_CONNECTIONS = 4       # 缓存连接池的主机数（论坛 + 头像图床）
+POOL_MAXSIZE = 16          # 每个主机保持的连接数，应不小于爬取并发数
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5        # 重试间隔 0.5s, 1s, 2s ...
+RETRY_STATUS = (500, 502, 504)  # 429/503 由限流器处理，见 wfmc_throttle
+
+
+class RequestCancelled(requests.RequestException):
+    """请求在等待限流或重试前被取消"""
+
+
+def endpoint_of(url):
+    """限流用的接口名：论坛 /api/users 等取资源名，其他主机（头像图床）归为 avatars"""
+    parts = urlsplit(url)
+    if parts.hostname != FORUM_HOST:
+        return "avatars"
+    path = parts.path.split("/")
+    return path[2] if len(path) > 2 and path[1] == "api" else parts.hostname
+
+
+class HttpClient:
+    def __init__(self, cookie="", pool_maxsize=POOL_MAXSIZE, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.cookie = ""
+        # 请求数与传输字节数统计，供基准测试对比
+        self.stats = {"requests": 0, "bytes": 0}
+        self.stats_lock = threading.Lock()
+        retry = Retry(
+            total=RETRY_TOTAL,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=False,  # 带 Retry-After 的 429/503 交给限流器处理
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+        self.set_cookie(cookie)
+
+    def set_cookie(self, cookie):
+        self.cookie = cookie or ""
+
+    def get(self, url, should_stop=None, **kwargs):
+        """GET 请求；被 429/503 限流时等接口暂停结束后重试。Cookie 只发给论坛域名，不泄露给头像图床
+
+        should_stop() 为 True 时不再等待限流或重试，抛出 RequestCancelled
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if self.cookie and urlsplit(url).hostname == FORUM_HOST:
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers.setdefault("Cookie", self.cookie)
+            kwargs["headers"] = headers
+        limiter = get_limiter(endpoint_of(url))
+        for attempt in range(THROTTLE_RETRIES + 1):
+            started = limiter.acquire(should_stop)
+            if started is None:
+                raise RequestCancelled(url)
+            try:
+                resp = self.session.get(url, **kwargs)
+            except requests.RequestException:
+                limiter.release(started)
+                raise
+            self.record(resp)
+            retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+            if not limiter.release(started, resp.status_code, retry_after) or attempt == THROTTLE_RETRIES:
+                return resp
+
+    def record(self, resp):
+        # raw.tell() 是实际从网络读到的（压缩后）字节数
+        size = resp.raw.tell() if hasattr(resp.raw, "tell") else len(resp.content)
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += size
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats = {"requests": 0, "bytes": 0}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(cookie=None):
+    """返回进程内共享的客户端，传入 cookie 时同步更新"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(cookie or "")
+        elif cookie is not None and cookie != _client.cookie:
+            _client.set_cookie(cookie)
+        return _client
@@ -0,0 +1,116 @@
+# WFMC 内存数据层：用户与帖子记录用 __slots__ 类代替逐条的 dict，
+# id 为整数、日期存为天数序号、用户名驻留，整站快照的内存占用小得多；
+# RecordList 在列表之外维护 id -> 行号索引，按 id 查找不必遍历
+import sys
+from array import array
+from datetime import date
+
+UNKNOWN_DATE = "未知"
+
+
+def day_number(iso_date):
+    """把 YYYY-MM-DD 转成天数序号作为排序键，无法解析时返回 0"""
+    try:
+        return date.fromisoformat(iso_date).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def day_text(day):
+    """day_number 的逆运算，0 表示日期未知"""
+    return date.fromordinal(day).isoformat() if day > 0 else UNKNOWN_DATE
+
+
+def intern(text):
+    return sys.intern(text) if text else text
+
+
+class UserRecord:
+    __slots__ = ("id", "name", "avatar_url", "avatar", "reg_day", "posts")
+    EXPORT_FIELDS = ("id", "name", "avatar_url", "reg_time", "posts")
+
+    def __init__(self, id, name, avatar_url, avatar, reg_day, posts):
+        self.id = int(id)
+        self.name = intern(name)
+        # 大量用户共用默认头像地址，驻留后只保存一份
+        self.avatar_url = intern(avatar_url)
+        self.avatar = intern(avatar)
+        self.reg_day = reg_day
+        self.posts = posts
+
+    @property
+    def reg_time(self):
+        return day_text(self.reg_day)
+
+    def __repr__(self):
+        return f"UserRecord({self.id}, {self.name!r})"
+
+
+class PostRecord:
+    __slots__ = ("id", "title", "created_day", "comment_count", "user_id")
+    EXPORT_FIELDS = ("id", "title", "created_at", "comment_count", "user_id")
+
+    def __init__(self, id, title, created_day, comment_count, user_id=None):
+        self.id = int(id)
+        self.title = title
+        self.created_day = created_day
+        self.comment_count = comment_count
+        self.user_id = int(user_id) if user_id is not None else None
+
+    @property
+    def created_at(self):
+        return day_text(self.created_day)
+
+    def __repr__(self):
+        return f"PostRecord({self.id}, {self.title!r})"
+
+
+def record_dict(record):
+    """导出用：按记录类的 EXPORT_FIELDS 转换为 dict"""
+    return {field: getattr(record, field) for field in record.EXPORT_FIELDS}
+
+
+class RecordList(list):
+    """按顺序保存记录，同时维护 id -> 行号索引；只通过 append / extend 追加"""
+    def __init__(self, records=()):
+        super().__init__(records)
+        self.rows = {r.id: row for row, r in enumerate(self)}
+
+    def append(self, record):
+        self.rows[record.id] = len(self)
+        super().append(record)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def upsert(self, records):
+        """按 id 合并一批记录：已有的原位替换，新的追加到末尾，返回新追加的记录"""
+        added = []
+        for record in records:
+            row = self.rows.get(record.id)
+            if row is None:
+                self.append(record)
+                added.append(record)
+            else:
+                self[row] = record
+        return added
+
+    def row_of(self, record_id):
+        return self.rows.get(record_id)
+
+    def get(self, record_id):
+        row = self.rows.get(record_id)
+        return None if row is None else self[row]
+
+
+def posts_by_user(posts, groups=None, start=0):
+    """一次遍历把帖子按作者分组，返回 用户 id -> 帖子行号数组
+
+    传入已有的 groups 和起始行号时只追加这一批帖子，供分批到达的数据增量关联
+    """
+    groups = {} if groups is None else groups
+    for row, post in enumerate(posts, start):
+        if post.user_id is not None:
+            groups.setdefault(post.user_id, array("i")).append(row)
+    return groups
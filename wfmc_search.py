@@ -0,0 +1,108 @@
+# 用户名搜索索引：预先计算归一化后的用户名（全角转半角、忽略大小写，
+# 安装了 pypinyin 时附带拼音全拼和首字母），用二元组倒排索引缩小候选范围，
+# 查询在上一次查询基础上延长时只在上一次的结果里继续筛选；
+# 另外按排序键缓存排好序的行号，切换排序方向时直接复用
+import unicodedata
+
+KEY_SEPARATOR = "\x00"     # 拼接多个搜索键时使用，保证查询不会跨键匹配
+
+_pinyin = None
+
+
+def load_pinyin():
+    """第一次遇到中文用户名时才导入 pypinyin（加载词典较慢），没有安装时返回 False"""
+    global _pinyin
+    if _pinyin is None:
+        try:
+            from pypinyin import lazy_pinyin, Style
+            _pinyin = (lazy_pinyin, Style)
+        except ImportError:  # 没有 pypinyin 时不支持拼音搜索
+            _pinyin = False
+    return _pinyin
+
+
+def normalize(text):
+    """NFKC 把全角字母数字转为半角，casefold 忽略大小写"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def has_cjk(text):
+    return any("\u4e00" <= ch <= "\u9fff" for ch in text)
+
+
+def search_keys(name):
+    keys = [normalize(name)]
+    if has_cjk(name) and load_pinyin():
+        lazy_pinyin, Style = _pinyin
+        keys.append("".join(lazy_pinyin(name)).casefold())
+        keys.append("".join(lazy_pinyin(name, style=Style.FIRST_LETTER)).casefold())
+    return keys
+
+
+def bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class NameIndex:
+    def __init__(self, records, field="name"):
+        self.records = records
+        self.field = field
+        self.keys = None  # 每行的搜索键，第一次搜索时才计算
+        self.grams = None  # 二元组 -> 行号集合，第一次需要时才建立
+        self.last_query = None
+        self.last_result = None
+
+    def build_keys(self):
+        field = self.field
+        self.keys = [KEY_SEPARATOR.join(search_keys(getattr(r, field))) for r in self.records]
+
+    def build_grams(self):
+        self.grams = {}
+        for row, key in enumerate(self.keys):
+            for gram in bigrams(key):
+                self.grams.setdefault(gram, set()).add(row)
+
+    def search(self, query):
+        """返回匹配的行号集合；查询为空时返回 None 表示全部匹配"""
+        q = normalize(query.strip())
+        if not q:
+            self.last_query = self.last_result = None
+            return None
+        if self.keys is None:
+            self.build_keys()
+
+        if self.last_query is not None and self.last_query in q:
+            # 新查询包含上一次查询，结果一定是上一次结果的子集
+            candidates = self.last_result
+        elif len(q) >= 2:
+            if self.grams is None:
+                self.build_grams()
+            sets = sorted((self.grams.get(g, set()) for g in bigrams(q)), key=len)
+            candidates = set.intersection(*sets) if sets else set()
+        else:
+            candidates = range(len(self.keys))
+
+        keys = self.keys
+        result = {row for row in candidates if q in keys[row]}
+        self.last_query, self.last_result = q, result
+        return result
+
+
+class SortOrders:
+    """按 (排序键, 方向) 缓存排好序的行号；数据变化时新建一个实例即可"""
+    def __init__(self, records, keys):
+        self.records = records
+        self.keys = keys  # 排序键名 -> 取键函数
+        self.cache = {}
+
+    def rows(self, sort_key, ascending=True):
+        order = self.cache.get((sort_key, ascending))
+        if order is None:
+            if ascending:
+                key = self.keys[sort_key]
+                records = self.records
+                order = sorted(range(len(records)), key=lambda i: key(records[i]))
+            else:
+                order = self.rows(sort_key, True)[::-1]
+            self.cache[(sort_key, ascending)] = order
+        return order
@@ -0,0 +1,266 @@
+# WFMC 本地数据存储（SQLite），保存用户、帖子和爬取元数据，
+# 启动时直接从本地读取，不必每次都重新爬取整个论坛
+import json, sqlite3, time
+
+from wfmc_records import UserRecord, PostRecord, day_number
+
+# =================== 配置 ===================
+STORE_FILE = "wfmc.db"
+BATCH_SIZE = 500           # 每次 executemany 写入的行数
+FULL_CRAWL_INTERVAL = 7 * 24 * 3600   # 增量更新之间至少每隔这么久做一次全量爬取
+CHECKPOINT_MAX_AGE = 24 * 3600        # 超过这么久的爬取断点不再续爬，重新开始
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    avatar TEXT,
+    avatar_url TEXT,
+    reg_time TEXT,
+    posts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_users_name ON users(name);
+CREATE INDEX IF NOT EXISTS idx_users_reg_time ON users(reg_time);
+CREATE INDEX IF NOT EXISTS idx_users_posts ON users(posts);
+
+CREATE TABLE IF NOT EXISTS discussions (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    created_at TEXT,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    user_id INTEGER,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_discussions_user_id ON discussions(user_id);
+CREATE INDEX IF NOT EXISTS idx_discussions_created_at ON discussions(created_at);
+
+CREATE TABLE IF NOT EXISTS avatars (
+    url_hash TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    file TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER,
+    content_type TEXT,
+    checked_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+    job TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    saved_at REAL,
+    PRIMARY KEY (job, page)
+);
+
+CREATE TABLE IF NOT EXISTS crawl_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def batched(rows, size=BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+class Store:
+    """每个线程各自打开一个 Store；WAL 模式下读写互不阻塞
+
+    shared 为 True 时允许跨线程使用同一连接，调用方需自行加锁
+    """
+    def __init__(self, path=STORE_FILE, shared=False):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=not shared)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 用户 ----------
+    def save_users(self, users, replace=True):
+        """批量写入用户；replace 为 True 时用本次结果整体替换旧数据"""
+        now = time.time()
+        rows = [
+            (u.id, u.name, u.avatar, u.avatar_url, u.reg_time, u.posts, now)
+            for u in users
+        ]
+        with self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM users")
+            for chunk in batched(rows):
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO users (id, name, avatar, avatar_url, reg_time, posts, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", chunk)
+            self._set_meta("users_crawled_at", str(now))
+
+    def load_users(self):
+        cur = self.conn.execute("SELECT id, name, avatar, avatar_url, reg_time, posts FROM users ORDER BY id")
+        return [UserRecord(row[0], row[1], row[3], row[2], day_number(row[4]), row[5]) for row in cur]
+
+    # ---------- 帖子 ----------
+    def save_discussions(self, posts, replace=True):
+        now = time.time()
+        rows = [
+            (p.id, p.title, p.created_at, p.comment_count, p.user_id, now)
+            for p in posts
+        ]
+        with self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM discussions")
+            for chunk in batched(rows):
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO discussions (id, title, created_at, comment_count, user_id, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", chunk)
+            self._set_meta("discussions_crawled_at", str(now))
+
+    def load_discussions(self):
+        cur = self.conn.execute("SELECT id, title, created_at, comment_count, user_id FROM discussions ORDER BY id")
+        return [PostRecord(row[0], row[1], day_number(row[2]), row[3], row[4]) for row in cur]
+
+    # ---------- 头像缓存索引 ----------
+    AVATAR_COLUMNS = ("url_hash", "url", "file", "etag", "last_modified", "size", "content_type", "checked_at")
+
+    def get_avatar(self, url_hash):
+        row = self.conn.execute(
+            f"SELECT {', '.join(self.AVATAR_COLUMNS)} FROM avatars WHERE url_hash = ?", (url_hash,)).fetchone()
+        return dict(zip(self.AVATAR_COLUMNS, row)) if row else None
+
+    def put_avatar(self, entry):
+        with self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO avatars ({', '.join(self.AVATAR_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                tuple(entry.get(c) for c in self.AVATAR_COLUMNS))
+
+    # ---------- 爬取断点 ----------
+    def load_checkpoint(self, job, max_age=CHECKPOINT_MAX_AGE):
+        """返回某个爬取任务已完成页面的 页序号 -> 原始响应；断点过期时清除并返回空字典"""
+        rows = self.conn.execute(
+            "SELECT page, body, saved_at FROM crawl_checkpoints WHERE job = ?", (job,)).fetchall()
+        if rows and time.time() - min(row[2] for row in rows) > max_age:
+            self.clear_checkpoint(job)
+            return {}
+        return {page: json.loads(body) for page, body, _ in rows}
+
+    def save_checkpoint_page(self, job, page, body):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO crawl_checkpoints (job, page, body, saved_at) VALUES (?, ?, ?, ?)",
+                (job, page, json.dumps(body, ensure_ascii=False), time.time()))
+
+    def clear_checkpoint(self, job):
+        with self.conn:
+            self.conn.execute("DELETE FROM crawl_checkpoints WHERE job = ?", (job,))
+
+    # ---------- 元数据 ----------
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO crawl_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self._set_meta(key, value)
+
+    def delete_meta(self, key):
+        with self.conn:
+            self.conn.execute("DELETE FROM crawl_meta WHERE key = ?", (key,))
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM crawl_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+
+def save_crawl(users=None, posts=None, full=True, complete=True, path=STORE_FILE):
+    """把一次爬取的结果写入本地存储；空结果不覆盖已有缓存，写入失败不影响爬取
+
+    full 表示这是一次全量爬取，会记录时间供 needs_full_crawl 判断；
+    complete 为 False（有页面抓取失败）时只合并进已有数据，不整体替换。不完整的全量爬取会清除
+    上次全量爬取的时间，下次更新仍做全量爬取并从断点补抓缺少的页面
+    """
+    try:
+        with Store(path) as store:
+            for kind, records, save in (("users", users, store.save_users),
+                                        ("discussions", posts, store.save_discussions)):
+                if records:
+                    save(records, replace=complete)
+                if records is None or not full:
+                    continue
+                if not complete:
+                    store.delete_meta(f"{kind}_full_crawled_at")
+                elif records:
+                    store.set_meta(f"{kind}_full_crawled_at", str(time.time()))
+    except sqlite3.Error:
+        pass
+
+
+# 分页爬取的断点：每完成一页就把该页的原始响应（记录、links.next 游标、总数）写入本地存储，
+# 程序关闭或网络中断后下次爬取同一任务时从已完成的页面继续；写入失败只会让断点失效，不影响爬取
+class Checkpoint:
+    KEEP_KEYS = ("data", "links", "meta")
+
+    def __init__(self, job, path=STORE_FILE, max_age=CHECKPOINT_MAX_AGE):
+        self.job = job  # 任务名，用分页地址模板区分用户、帖子、增量等不同爬取
+        self.path = path
+        self.max_age = max_age
+        self.store = None  # 在爬取线程里第一次使用时打开
+
+    def _open(self):
+        if self.store is None:
+            self.store = Store(self.path)
+        return self.store
+
+    def load(self):
+        try:
+            return self._open().load_checkpoint(self.job, self.max_age)
+        except (sqlite3.Error, ValueError):
+            return {}
+
+    def save(self, page, body):
+        try:
+            self._open().save_checkpoint_page(self.job, page, {k: body[k] for k in self.KEEP_KEYS if k in body})
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        try:
+            self._open().clear_checkpoint(self.job)
+        except sqlite3.Error:
+            pass
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+
+def needs_full_crawl(kind, max_age=FULL_CRAWL_INTERVAL, path=STORE_FILE):
+    """kind 为 "users" 或 "discussions"；从未全量爬取或上次全量爬取已过期时返回 True"""
+    try:
+        with Store(path) as store:
+            last = store.get_meta(f"{kind}_full_crawled_at")
+    except sqlite3.Error:
+        return True
+    return last is None or time.time() - float(last) > max_age
+
+
+def load_snapshot(kind, path=STORE_FILE):
+    """读取某一类缓存数据，kind 为 "users" 或 "discussions"，出错时返回空列表"""
+    try:
+        with Store(path) as store:
+            return store.load_users() if kind == "users" else store.load_discussions()
+    except sqlite3.Error:
+        return []
+
+
+def load_cached(path=STORE_FILE):
+    """读取本地缓存，返回 (users, posts)"""
+    return load_snapshot("users", path), load_snapshot("discussions", path)
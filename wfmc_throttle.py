@@ -0,0 +1,139 @@
+# 自适应限流：按接口（用户列表、帖子列表、头像图床……）分别维护一个并发窗口，用 AIMD 调整——
+# 请求成功且延迟正常时窗口加性增长，被 429/503 限流、5xx、网络出错或延迟明显变长时乘性减小；
+# 被限流时该接口整体暂停到 Retry-After 指定的时间。每个接口的最大并发与每秒请求数即其预算，
+# 用户、帖子爬虫与头像下载经由共享的 HttpClient 使用同一组限流器
+import threading, time
+from email.utils import parsedate_to_datetime
+
+from wfmc_core import CRAWL_CONCURRENCY, CRAWL_RATE_LIMIT, TokenBucket
+
+# =================== 配置 ===================
+THROTTLE_STATUS = (429, 503)   # 服务器要求减速的状态码，由限流器处理而不交给 urllib3 重试
+THROTTLE_RETRIES = 5           # 同一请求被限流后最多重试的次数
+DEFAULT_RETRY_AFTER = 2.0      # 没有 Retry-After 时暂停的秒数，连续被限流时逐次翻倍
+INITIAL_WINDOW = 2             # 每个接口起始的并发窗口
+AIMD_INCREASE = 1.0            # 一整个窗口的请求都正常完成后窗口 +1
+AIMD_DECREASE = 0.5            # 被限流或出错时窗口乘以该系数
+LATENCY_DECREASE = 0.8         # 延迟明显变长时窗口乘以该系数
+LATENCY_TOLERANCE = 2.0        # 近期延迟超过基准延迟的这么多倍视为服务器吃紧
+LATENCY_FAST = 0.3             # 近期延迟（指数滑动平均）的平滑系数
+LATENCY_SLOW = 0.02            # 基准延迟的平滑系数，变化很慢
+CANCEL_POLL = 0.2              # 等待限流期间每隔这么久检查一次是否已被取消（秒）
+
+# 接口 -> (最大并发, 每秒最多请求数)
+ENDPOINT_BUDGETS = {
+    "users": (CRAWL_CONCURRENCY, CRAWL_RATE_LIMIT),
+    "discussions": (CRAWL_CONCURRENCY, CRAWL_RATE_LIMIT),
+    "avatars": (8, 20.0),
+}
+DEFAULT_BUDGET = (CRAWL_CONCURRENCY, CRAWL_RATE_LIMIT)
+
+
+def retry_after_seconds(value):
+    """解析 Retry-After（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, max_concurrency, rate, start=INITIAL_WINDOW):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.window = float(min(start, self.max_concurrency))
+        self.bucket = TokenBucket(rate)  # 预算里的速率上限
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.strikes = 0  # 连续被限流的次数
+        self.latency = None  # 近期延迟
+        self.baseline = None  # 基准延迟
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+
+    def set_budget(self, max_concurrency=None, rate=None):
+        with self.cond:
+            if max_concurrency:
+                self.max_concurrency = max(1, max_concurrency)
+                self.window = min(self.window, self.max_concurrency)
+            if rate:
+                self.bucket.set_rate(rate)
+            self.cond.notify_all()
+
+    def acquire(self, should_stop=None):
+        """等到窗口有空位且不在暂停期，返回请求开始时间，交给 release 计算延迟
+
+        should_stop() 为 True 时放弃等待并返回 None，取消不必等完服务器给的 Retry-After
+        """
+        with self.cond:
+            while True:
+                if should_stop and should_stop():
+                    return None
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.window):
+                    break
+                timeout = wait if wait > 0 else None
+                if should_stop:
+                    timeout = min(timeout or CANCEL_POLL, CANCEL_POLL)
+                self.cond.wait(timeout)
+            self.in_flight += 1
+        self.bucket.acquire()
+        return time.monotonic()
+
+    def release(self, started, status=None, retry_after=None):
+        """请求结束后调用，status 为 None 表示网络错误；被限流时返回 True，调用方应重试
+
+        只有 2xx/3xx 才计入延迟并扩大窗口，404 等 4xx 不说明服务器状况，窗口保持不变
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self.cond:
+            self.in_flight -= 1
+            throttled = status in THROTTLE_STATUS
+            if throttled:
+                self.strikes += 1
+                if retry_after is None:
+                    retry_after = DEFAULT_RETRY_AFTER * 2 ** (self.strikes - 1)
+                self.paused_until = max(self.paused_until, now + retry_after)
+                self.decrease(now, AIMD_DECREASE)
+            elif status is None or status >= 500:
+                # 网络错误和 5xx 都说明服务器吃紧
+                self.decrease(now, AIMD_DECREASE)
+            elif status < 400:
+                self.strikes = 0
+                if self.latency is None:
+                    self.latency = self.baseline = latency
+                else:
+                    self.latency += (latency - self.latency) * LATENCY_FAST
+                    self.baseline += (latency - self.baseline) * LATENCY_SLOW
+                if self.latency > self.baseline * LATENCY_TOLERANCE:
+                    self.decrease(now, LATENCY_DECREASE)
+                else:
+                    self.window = min(self.max_concurrency, self.window + AIMD_INCREASE / self.window)
+            self.cond.notify_all()
+            return throttled
+
+    def decrease(self, now, factor):
+        # 同一轮往返内收到的多个拥塞信号只减一次，避免窗口被连续砍到底
+        if now - self.last_decrease > (self.latency or 0):
+            self.window = max(1.0, self.window * factor)
+            self.last_decrease = now
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(endpoint):
+    """返回进程内共享的接口限流器，第一次使用时按 ENDPOINT_BUDGETS 创建"""
+    with _limiters_lock:
+        limiter = _limiters.get(endpoint)
+        if limiter is None:
+            limiter = _limiters[endpoint] = AdaptiveLimiter(endpoint, *ENDPOINT_BUDGETS.get(endpoint, DEFAULT_BUDGET))
+        return limiter